@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Linux Bing Wallpaper ベンチマーク
+ローカルのBing API代替サーバーを相手に取得・ギャラリー構築・壁紙設定を計測し、
+結果をJSONで出力する（--compare で過去の結果と比較可能）
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# ウィンドウを表示せずに計測する
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from mock_bing import MockBingConfig, MockBingServer  # noqa: E402
+
+
+def _peak_rss_kb():
+    """プロセス開始からのピークRSS（KB）"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _summarize(samples):
+    return {
+        'runs': samples,
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'max': max(samples),
+    }
+
+
+def _install_stub_setters(bin_dir):
+    """壁紙設定コマンドのスタブを作成（実際のデスクトップには触れない）"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("feh", "nitrogen", "gsettings", "plasma-apply-wallpaperimage", "xfconf-query"):
+        stub = bin_dir / name
+        stub.write_text("#!/bin/sh\nexit 0\n")
+        stub.chmod(0o755)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+
+
+def _no_reuse(main, bandwidth_limit=0):
+    """毎回ダウンロードさせるため既存ファイルの再利用を無効にしたポリシー"""
+    return main.FetchPolicy(bandwidth_limit=bandwidth_limit, reuse_existing=False)
+
+
+def bench_refresh(main, base_url, wallpaper_dir, repeat, bandwidth_limit=0):
+    """取得処理（API + ダウンロード + 保存）の所要時間と画像ごとのスループット"""
+    durations = []
+    throughputs = []
+    images = 0
+    total_bytes = 0
+    wallpapers = []
+
+    # 合成画像の生成や接続確立を計測から除くため1回空打ちする
+    main.WallpaperFetcher(wallpaper_dir, base_url=base_url, policy=_no_reuse(main)).run()
+
+    main.tracer.enabled = True
+    for _ in range(repeat):
+        main.tracer.clear()
+        result = {}
+        fetcher = main.WallpaperFetcher(wallpaper_dir, base_url=base_url,
+                                        policy=_no_reuse(main, bandwidth_limit))
+        fetcher.finished.connect(result.update)
+        fetcher.error.connect(lambda msg: result.setdefault('error', msg))
+
+        started = time.perf_counter()
+        fetcher.run()  # 同期実行して純粋な取得時間を測る
+        durations.append(time.perf_counter() - started)
+
+        if 'error' in result:
+            raise RuntimeError(f"取得に失敗しました: {result['error']}")
+        wallpapers = result['wallpapers']
+
+        for event in main.tracer.events():
+            if event['name'] != "fetch.download":
+                continue
+            size = event['attrs'].get('bytes', 0)
+            seconds = event['duration_us'] / 1_000_000
+            throughputs.append(size / seconds if seconds else 0.0)
+            total_bytes += size
+            images += 1
+    main.tracer.enabled = False
+    main.tracer.clear()
+
+    return wallpapers, {
+        'seconds': _summarize(durations),
+        'image_bytes_per_second': _summarize(throughputs),
+        'images_per_second': images / sum(durations),
+        'bytes_total': total_bytes,
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def _mixed_sources(main, base_url, folder):
+    """Bing・APOD・マニフェスト・ローカルフォルダを全て有効にしたソース一覧"""
+    return [
+        main.BingSource(base_url),
+        main.ApodSource(f"{base_url}/planetary/apod"),
+        main.ManifestSource(f"{base_url}/drop/manifest.json"),
+        main.FolderSource(folder),
+    ]
+
+
+def bench_sources(main, base_url, wallpaper_dir, folder, repeat, workers):
+    """複数ソースを共通パイプラインで並列取得したときの所要時間とソース別スループット"""
+    durations = []
+    per_source = {}
+
+    # 合成画像の生成を計測から除くため1回空打ちする
+    main.WallpaperFetcher(wallpaper_dir, policy=_no_reuse(main),
+                          sources=_mixed_sources(main, base_url, folder), workers=workers).run()
+
+    for _ in range(repeat):
+        result = {}
+        fetcher = main.WallpaperFetcher(wallpaper_dir, policy=_no_reuse(main),
+                                        sources=_mixed_sources(main, base_url, folder),
+                                        workers=workers)
+        fetcher.finished.connect(result.update)
+        fetcher.error.connect(lambda msg: result.setdefault('error', msg))
+        started = time.perf_counter()
+        fetcher.run()
+        durations.append(time.perf_counter() - started)
+        if 'error' in result:
+            raise RuntimeError(f"取得に失敗しました: {result['error']}")
+        for name, metrics in result['metrics'].items():
+            per_source.setdefault(name, []).append(metrics['bytes_per_second'])
+
+    # 2回目以降はインデックスから再利用され、転送が発生しないことを確認する
+    result = {}
+    fetcher = main.WallpaperFetcher(wallpaper_dir, sources=_mixed_sources(main, base_url, folder),
+                                    workers=workers)
+    fetcher.finished.connect(result.update)
+    started = time.perf_counter()
+    fetcher.run()
+    cached_seconds = time.perf_counter() - started
+
+    return {
+        'seconds': _summarize(durations),
+        'cached_seconds': cached_seconds,
+        'cached_bytes': sum(m['bytes'] for m in result['metrics'].values()),
+        'images': len(result['wallpapers']),
+        'workers': workers,
+        'source_bytes_per_second': {name: _summarize(samples)
+                                    for name, samples in per_source.items()},
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def _run_backfill(main, server, wallpaper_dir, markets, stop_after_pages=0):
+    """クローラーを同期実行し、(結果, 取得したページ数, 秒数) を返す"""
+    result = {}
+    api_path = "/HPImageArchive.aspx"
+    first_page = server.request_counts.get(api_path, 0)
+    crawler = main.BackfillCrawler(wallpaper_dir, markets=markets, base_url=server.base_url,
+                                   page_interval=0)
+
+    def pages():
+        return server.request_counts.get(api_path, 0) - first_page
+
+    def on_progress(*_):
+        if stop_after_pages and pages() >= stop_after_pages:
+            crawler.stop()  # 途中で中断したのと同じ状態を作る
+
+    crawler.progress.connect(on_progress)
+    crawler.finished.connect(result.update)
+    crawler.error.connect(lambda msg: result.setdefault('error', msg))
+    started = time.perf_counter()
+    crawler.run()
+    seconds = time.perf_counter() - started
+    if 'error' in result:
+        raise RuntimeError(f"バックフィルに失敗しました: {result['error']}")
+    return result, pages(), seconds
+
+
+def bench_backfill(main, server, wallpaper_dir, markets, stop_after_pages):
+    """多ページのアーカイブを既定の帯域制限で遡り、中断・再開・再実行時の取得を確認する"""
+    wallpaper_dir.mkdir()
+
+    def requests_made():
+        return sum(server.request_counts.values())
+
+    before = requests_made()
+    first, first_pages, first_seconds = _run_backfill(
+        main, server, wallpaper_dir, markets, stop_after_pages)
+    after_first = requests_made()
+    resumed, resumed_pages, resumed_seconds = _run_backfill(
+        main, server, wallpaper_dir, markets)
+    after_resume = requests_made()
+    # 全市場を遡り終えた後の再実行では何も取得しないはず
+    rerun, _, rerun_seconds = _run_backfill(main, server, wallpaper_dir, markets)
+    rerun_requests = requests_made() - after_resume
+
+    # モックはどの市場でも同じ画像（同じ hsh）を返すので、2つ目以降の市場は既出として1ページで終わる
+    entries = main.WallpaperIndex(wallpaper_dir).entries
+    files = sorted({Path(entry['path']).name for entry in entries.values()})
+    expected = server.config.image_count
+    if len(entries) != expected:
+        raise RuntimeError(f"バックフィルの取得件数が一致しません: {len(entries)} != {expected}")
+    if rerun_requests or rerun['wallpapers']:
+        raise RuntimeError(f"完了後の再実行でリクエストが発生しました: {rerun_requests}")
+    # 帯域制限をかけても途中で解像度が切り替わらないこと
+    resolutions = sorted({main.BingSource().resolution_of(wallpaper_dir / name) for name in files})
+    if len(resolutions) != 1:
+        raise RuntimeError(f"バックフィル中に解像度が変わりました: {resolutions}")
+
+    return {
+        'images': expected,
+        'files': len(files),
+        'markets': markets,
+        'resolution': resolutions[0],
+        'interrupted': {'pages': first_pages, 'images': len(first['wallpapers']),
+                        'requests': after_first - before, 'seconds': first_seconds},
+        'resumed': {'pages': resumed_pages, 'images': len(resumed['wallpapers']),
+                    'requests': after_resume - after_first, 'seconds': resumed_seconds},
+        'rerun': {'requests': rerun_requests, 'seconds': rerun_seconds},
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def _fetch_through(main, base_url, wallpaper_dir, market):
+    result = {}
+    fetcher = main.WallpaperFetcher(wallpaper_dir, sources=[main.BingSource(base_url, market)])
+    fetcher.finished.connect(result.update)
+    fetcher.error.connect(lambda msg: result.setdefault('error', msg))
+    started = time.perf_counter()
+    fetcher.run()
+    if 'error' in result:
+        raise RuntimeError(f"ミラー経由の取得に失敗しました: {result['error']}")
+    return result, time.perf_counter() - started
+
+
+def bench_mirror(main, upstream_url, directory, markets):
+    """LANミラー経由の取得（初回と2台目）の所要時間と、上流への問い合わせ・アーカイブへの登録を確認する"""
+    mirror_dir = directory / "mirror"
+    mirror_dir.mkdir(parents=True)
+    mirror = main.WallpaperMirror(mirror_dir, upstream=upstream_url)
+    server = main.MirrorServer(mirror, host="127.0.0.1", port=0).start()
+    try:
+        cold, warm = [], []
+        for market in markets:
+            # 市場ごとに別の端末として取得し、どの市場の画像もミラーを通るようにする
+            result, seconds = _fetch_through(main, server.base_url,
+                                             directory / f"client1-{market}", market)
+            cold.append(seconds)
+            images = len(result['wallpapers'])
+        cold_requests = mirror.upstream_requests
+        # 2台目のクライアントは全てミラーのキャッシュから取得できるはず
+        for market in markets:
+            _, seconds = _fetch_through(main, server.base_url,
+                                        directory / f"client2-{market}", market)
+            warm.append(seconds)
+        warm_requests = mirror.upstream_requests - cold_requests
+    finally:
+        server.stop()
+    if warm_requests:
+        raise RuntimeError(f"キャッシュ済みの取得で上流に問い合わせました: {warm_requests}")
+
+    # ミラーがアーカイブに書いたファイルは全て Bing のエントリとして登録され、手動追加扱いにならない
+    sync = main.ArchiveSync(mirror_dir)
+    manual = [wallpaper['path'] for wallpaper in sync.rescan()['added']
+              if wallpaper['source'] == main.ARCHIVE_SOURCE]
+    sync.close()
+    if manual:
+        raise RuntimeError(f"ミラーが登録せずに保存したファイルがあります: {manual}")
+
+    return {
+        'markets': markets,
+        'images_per_market': images,
+        'cold_seconds': _summarize(cold),
+        'warm_seconds': _summarize(warm),
+        'upstream_requests': cold_requests,
+        'archive_files': len(list(mirror_dir.glob("*.jpg"))),
+        'mirror_cache_files': len(list((mirror_dir / main.MIRROR_CACHE_DIR_NAME).glob("images/*"))),
+    }
+
+
+def _create_window(main):
+    """起動時の自動取得を止めたメインウィンドウを生成する"""
+    class BenchWindow(main.BingWallpaperApp):
+        def fetch_wallpapers(self):
+            pass
+
+    return BenchWindow()
+
+
+def bench_gallery(main, app, window, wallpapers, repeat):
+    """ギャラリー（配置と、見えているタイルのサムネイルのデコード・描画）の構築時間"""
+    durations = []
+    window.wallpapers = wallpapers
+    window.show()  # タイルは描画時に読み込むので、画面に出して計測する
+    for _ in range(repeat):
+        window.clear_gallery()
+        main.pixmap_cache.clear()  # デコードを含めて計測する
+        app.processEvents()
+        started = time.perf_counter()
+        window.populate_gallery()
+        app.processEvents()
+        window.repaint()
+        durations.append(time.perf_counter() - started)
+    return {
+        'seconds': _summarize(durations),
+        'tiles': len(wallpapers),
+        'pixmap_cache_bytes': main.pixmap_cache.used,
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def bench_preview(main, app, window, wallpapers, repeat):
+    """クリックからプレビュー表示まで（先読みなし／ホバーで先読み済み）の時間"""
+    cold = []
+    prefetched = []
+    for i in range(repeat * len(wallpapers)):
+        path = wallpapers[i % len(wallpapers)]['path']
+
+        main.pixmap_cache.clear()
+        started = time.perf_counter()
+        window.on_wallpaper_selected(path)
+        cold.append(time.perf_counter() - started)
+
+        main.pixmap_cache.clear()
+        window.preview_prefetcher.prefetch(path)
+        window.preview_prefetcher.pool.waitForDone()
+        app.processEvents()
+        started = time.perf_counter()
+        window.on_wallpaper_selected(path)
+        prefetched.append(time.perf_counter() - started)
+    return {
+        'seconds': _summarize(cold),
+        'prefetched_seconds': _summarize(prefetched),
+        'pixmap_cache_bytes': main.pixmap_cache.used,
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def bench_set_wallpaper(window, wallpapers, repeat):
+    """スタブコマンドを使った壁紙設定のレイテンシ"""
+    window.desktop_combo.setCurrentIndex(window.desktop_combo.count() - 1)  # その他 (feh)
+    durations = []
+    for i in range(repeat):
+        window.current_wallpaper = wallpapers[i % len(wallpapers)]['path']
+        started = time.perf_counter()
+        window.set_wallpaper()
+        durations.append(time.perf_counter() - started)
+    return {
+        'seconds': _summarize(durations),
+        'status': window.status_label.text(),
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def _tiny_jpeg(color):
+    import io
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 36), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def _wait_for(app, predicate, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise RuntimeError("フォルダの変更が反映されませんでした")
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def bench_archive_sync(main, app, directory, files, repeat, debounce_ms):
+    """大量のファイルがあるフォルダで、監視による差分反映と全体の再走査の遅延・CPU時間を比べる"""
+    directory.mkdir()
+    base = _tiny_jpeg((40, 80, 120))
+    for i in range(files):
+        # JPEG の終端より後ろに番号を足して内容ハッシュを別々にする
+        (directory / f"archive_{i:05d}.jpg").write_bytes(base + i.to_bytes(4, "big"))
+
+    sync = main.ArchiveSync(directory, debounce_ms=debounce_ms)
+    synced = []
+    sync.synced.connect(synced.append)
+    started = time.perf_counter()
+    sync.rescan()  # 初回のインデックスとサムネイル作成
+    initial_seconds = time.perf_counter() - started
+
+    operations = {
+        'add': lambda i: (directory / f"new_{i}.jpg").write_bytes(base + b"new" + bytes([i])),
+        'modify': lambda i: (directory / f"archive_{i:05d}.jpg").write_bytes(base + b"mod" + bytes([i])),
+        'rename': lambda i: os.rename(directory / f"archive_{100 + i:05d}.jpg",
+                                      directory / f"renamed_{i}.jpg"),
+        'delete': lambda i: os.remove(directory / f"archive_{200 + i:05d}.jpg"),
+    }
+    results = {}
+    for name, operation in operations.items():
+        incremental, incremental_cpu, rescan, rescan_cpu = [], [], [], []
+        for i in range(repeat):
+            # 監視による反映（デバウンスの待ち時間を含む）
+            synced.clear()
+            started, cpu = time.perf_counter(), time.process_time()
+            operation(2 * i)
+            _wait_for(app, lambda: synced)
+            incremental.append(time.perf_counter() - started)
+            incremental_cpu.append(time.process_time() - cpu)
+
+            # 同じ変更を全体の再走査で反映
+            operation(2 * i + 1)
+            started, cpu = time.perf_counter(), time.process_time()
+            sync.rescan()
+            rescan.append(time.perf_counter() - started)
+            rescan_cpu.append(time.process_time() - cpu)
+            # 再走査した変更の通知を読み捨てる
+            sync.pending.clear()
+            app.processEvents()
+        results[name] = {
+            'seconds': _summarize(incremental),
+            'cpu_seconds': _summarize(incremental_cpu),
+            'rescan_seconds': _summarize(rescan),
+            'rescan_cpu_seconds': _summarize(rescan_cpu),
+        }
+
+    # 一括コピーが1回の反映にまとまるか
+    synced.clear()
+    started = time.perf_counter()
+    for i in range(100):
+        (directory / f"burst_{i}.jpg").write_bytes(base + b"burst" + bytes([i]))
+    _wait_for(app, lambda: sum(len(batch['added']) for batch in synced) >= 100)
+    burst_seconds = time.perf_counter() - started
+    batches = len(synced)
+    sync.close()
+
+    return {
+        'files': files,
+        'backend': sync.backend,
+        'debounce_ms': debounce_ms,
+        'initial_index_seconds': initial_seconds,
+        'operations': results,
+        'burst': {'files': 100, 'seconds': burst_seconds, 'batches': batches},
+        'peak_rss_kb': _peak_rss_kb(),
+    }
+
+
+def compare(current, baseline_path):
+    """過去の結果との中央値の比を表示（1.0より大きいほど遅くなった）"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"{'metric':<32}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, metrics in current['results'].items():
+        base_metrics = baseline.get('results', {}).get(name)
+        if not base_metrics:
+            continue
+        for key in ('seconds', 'prefetched_seconds', 'image_bytes_per_second',
+                    'rescan_seconds', 'cpu_seconds'):
+            if key not in metrics or key not in base_metrics:
+                continue
+            now = metrics[key]['median']
+            before = base_metrics[key]['median']
+            ratio = now / before if before else float('nan')
+            print(f"{name + '.' + key:<32}{before:>12.4g}{now:>12.4g}{ratio:>8.2f}")
+        if 'peak_rss_kb' in metrics and 'peak_rss_kb' in base_metrics:
+            before, now = base_metrics['peak_rss_kb'], metrics['peak_rss_kb']
+            print(f"{name + '.peak_rss_kb':<32}{before:>12}{now:>12}{now / before:>8.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Linux Bing Wallpaper ベンチマーク")
+    parser.add_argument("--images", type=int, default=8, help="API が返す画像枚数")
+    parser.add_argument("--width", type=int, default=1920, help="合成画像の幅")
+    parser.add_argument("--height", type=int, default=1080, help="合成画像の高さ")
+    parser.add_argument("--latency", type=float, default=0.0, help="リクエストごとの遅延（秒）")
+    parser.add_argument("--bandwidth", type=int, default=0, help="接続ごとの帯域（バイト/秒、0で無制限）")
+    parser.add_argument("--bandwidth-limit", type=int, default=0,
+                        help="クライアント側の帯域上限（バイト/秒、0で無制限）")
+    parser.add_argument("--repeat", type=int, default=3, help="各計測の繰り返し回数")
+    parser.add_argument("--workers", type=int, default=4, help="複数ソース取得の並列ダウンロード数")
+    parser.add_argument("--backfill-images", type=int, default=40,
+                        help="バックフィル計測で市場ごとに遡る画像枚数（0で省略）")
+    parser.add_argument("--archive-files", type=int, default=10000,
+                        help="フォルダ監視の計測に使うファイル数（0で省略）")
+    parser.add_argument("--archive-debounce-ms", type=int, default=50,
+                        help="フォルダ監視の計測でのデバウンス時間（ミリ秒）")
+    parser.add_argument("--output", help="結果JSONの出力先（省略時は標準出力）")
+    parser.add_argument("--compare", metavar="BASELINE", help="比較対象の結果JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bingwall-bench-") as tmp:
+        tmp_path = Path(tmp)
+        # 設定ファイル・壁紙フォルダ・サムネイルや合成画像のキャッシュがユーザー環境に作られないよう
+        # HOME と XDG の各ディレクトリを差し替える
+        os.environ["HOME"] = str(tmp_path / "home")
+        os.environ["XDG_CONFIG_HOME"] = str(tmp_path / "home" / ".config")
+        os.environ["XDG_CACHE_HOME"] = str(tmp_path / "home" / ".cache")
+        _install_stub_setters(tmp_path / "bin")
+
+        import main as app_main
+        from PyQt6.QtWidgets import QApplication
+
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        wallpaper_dir = tmp_path / "wallpapers"
+        wallpaper_dir.mkdir()
+
+        config = MockBingConfig(args.images, args.width, args.height,
+                                args.latency, args.bandwidth)
+        results = {}
+        with MockBingServer(config) as server:
+            wallpapers, results['refresh'] = bench_refresh(
+                app_main, server.base_url, wallpaper_dir, args.repeat, args.bandwidth_limit)
+
+            # ローカルフォルダ用に取得済みの壁紙をコピーしておく
+            folder = tmp_path / "folder"
+            folder.mkdir()
+            for wallpaper in wallpapers:
+                shutil.copy(wallpaper['path'], folder / f"local_{Path(wallpaper['path']).name}")
+            results['sources'] = bench_sources(app_main, server.base_url, tmp_path / "mixed",
+                                               folder, args.repeat, args.workers)
+            results['mirror'] = bench_mirror(app_main, server.base_url, tmp_path / "lan",
+                                             ["ja-JP", "en-US"])
+
+        if args.backfill_images:
+            # 既定の帯域制限で時間がかかりすぎないよう小さめの画像で遡る
+            backfill_config = MockBingConfig(args.backfill_images, 640, 360, args.latency)
+            with MockBingServer(backfill_config) as server:
+                results['backfill'] = bench_backfill(app_main, server, tmp_path / "backfill",
+                                                     ["ja-JP", "en-US"], stop_after_pages=2)
+
+        window = _create_window(app_main)
+        results['gallery'] = bench_gallery(app_main, app, window, wallpapers, args.repeat)
+        results['preview'] = bench_preview(app_main, app, window, wallpapers, args.repeat)
+        results['set_wallpaper'] = bench_set_wallpaper(window, wallpapers, args.repeat)
+        if args.archive_files:
+            sync = bench_archive_sync(app_main, app, tmp_path / "archive", args.archive_files,
+                                      args.repeat, args.archive_debounce_ms)
+            # 操作ごとの結果を比較できるよう展開する
+            for name, metrics in sync.pop('operations').items():
+                results[f'archive_sync.{name}'] = metrics
+            results['archive_sync'] = sync
+        window.auto_timer.stop()
+        window.deleteLater()
+        app.processEvents()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'config': vars(args),
+        'results': results,
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Bing HPImageArchive.aspx のローカル代替サーバー
+ベンチマーク用に合成JPEGを返し、サイズ・遅延・帯域を設定できる
+APOD形式のフィード (/planetary/apod) とJSONマニフェスト (/drop/manifest.json) も配信する
+"""
+
+import io
+import json
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from PIL import Image
+
+# 画像IDの末尾から解像度を取り出す (例: OHR.Mock3_JA-JP_1920x1080.jpg, OHR.Mock3_JA-JP_UHD.jpg)
+_RESOLUTION_PATTERN = re.compile(r"_(?:(\d+)x(\d+)|UHD)\.jpg$")
+# APOD・マニフェストの画像パス (例: /apod/image/2024-01-01_hd.jpg, /drop/images/drop3.jpg)
+_SOURCE_IMAGE_PATTERN = re.compile(r"^/(apod/image|drop/images)/([\w.-]+)\.jpg$")
+_CHUNK_SIZE = 16 * 1024
+
+
+class MockBingConfig:
+    """モックサーバーの挙動設定"""
+
+    def __init__(self, image_count=8, width=1920, height=1080, latency=0.0,
+                 bandwidth=0, quality=90, fail_first=0):
+        self.image_count = image_count  # アーカイブ全体の画像枚数
+        self.width = width              # url で返す既定解像度
+        self.height = height
+        self.latency = latency          # 各リクエストの応答遅延（秒）
+        self.bandwidth = bandwidth      # 1接続あたりの帯域（バイト/秒、0で無制限）
+        self.quality = quality          # 合成JPEGの品質
+        self.fail_first = fail_first    # 各画像の最初のN回は503を返す（再試行の検証用）
+
+
+class _MockBingHandler(BaseHTTPRequestHandler):
+    """HPImageArchive.aspx・/th 画像パス・APOD・マニフェストを処理"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # ベンチマーク出力を汚さないようアクセスログは出さない
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if server.config.latency:
+            time.sleep(server.config.latency)
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        server.count_request(parsed.path)
+
+        if parsed.path == "/HPImageArchive.aspx":
+            idx = int(query.get('idx', ['0'])[0])
+            n = int(query.get('n', ['1'])[0])
+            mkt = query.get('mkt', ['ja-JP'])[0]
+            body = json.dumps(server.archive_page(idx, n, mkt)).encode('utf-8')
+            self._send(200, body, "application/json; charset=utf-8")
+        elif parsed.path == "/th" and 'id' in query:
+            image_id = query['id'][0]
+            match = _RESOLUTION_PATTERN.search(image_id)
+            if not match:
+                self._send(404, b"not found", "text/plain")
+                return
+            if server.should_fail(image_id):
+                self._send(503, b"service unavailable", "text/plain")
+                return
+            if match.group(1):
+                width, height = int(match.group(1)), int(match.group(2))
+            else:
+                # UHD は既定解像度の2倍として扱う
+                width, height = server.config.width * 2, server.config.height * 2
+            self._send(200, server.image_bytes(image_id, width, height), "image/jpeg")
+        elif parsed.path == "/planetary/apod":
+            body = json.dumps(server.apod_feed()).encode('utf-8')
+            self._send(200, body, "application/json; charset=utf-8")
+        elif parsed.path == "/drop/manifest.json":
+            body = json.dumps(server.manifest()).encode('utf-8')
+            self._send(200, body, "application/json; charset=utf-8")
+        elif _SOURCE_IMAGE_PATTERN.match(parsed.path):
+            name = _SOURCE_IMAGE_PATTERN.match(parsed.path).group(2)
+            # _hd 付きは既定解像度、それ以外は半分のサイズ
+            if name.endswith("_hd") or parsed.path.startswith("/drop/"):
+                width, height = server.config.width, server.config.height
+            else:
+                width, height = server.config.width // 2, server.config.height // 2
+            self._send(200, server.image_bytes(parsed.path, width, height), "image/jpeg")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        bandwidth = self.server.config.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        # 帯域制限：チャンクごとに送信時間を調整
+        started = time.perf_counter()
+        for offset in range(0, len(body), _CHUNK_SIZE):
+            chunk = body[offset:offset + _CHUNK_SIZE]
+            self.wfile.write(chunk)
+            expected = (offset + len(chunk)) / bandwidth
+            elapsed = time.perf_counter() - started
+            if expected > elapsed:
+                time.sleep(expected - elapsed)
+
+
+class MockBingServer(ThreadingHTTPServer):
+    """バックグラウンドスレッドで動くBing API代替サーバー"""
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), _MockBingHandler)
+        self.config = config or MockBingConfig()
+        self.request_counts = {}
+        self._failures = {}
+        self._image_cache = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def count_request(self, path):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def should_fail(self, image_id):
+        """fail_first 回に達するまで同じ画像への要求を失敗させる"""
+        with self._lock:
+            count = self._failures.get(image_id, 0)
+            if count >= self.config.fail_first:
+                return False
+            self._failures[image_id] = count + 1
+            return True
+
+    def archive_page(self, idx, n, mkt):
+        """idx から n 件分の images 配列を返す（idx=0 が最新）"""
+        n = max(0, min(n, 8))
+        today = date.today()
+        images = []
+        for i in range(idx, min(idx + n, self.config.image_count)):
+            day = today - timedelta(days=i)
+            urlbase = f"/th?id=OHR.Mock{i}_{mkt.upper()}"
+            images.append({
+                'startdate': day.strftime("%Y%m%d"),
+                'enddate': (day + timedelta(days=1)).strftime("%Y%m%d"),
+                'url': f"{urlbase}_{self.config.width}x{self.config.height}.jpg&rf=LaDigue_{self.config.width}x{self.config.height}.jpg",
+                'urlbase': urlbase,
+                'copyright': f"Mock image {i} (© Benchmark)",
+                'title': f"Mock wallpaper {i}",
+                'hsh': f"mock{i:08d}",
+            })
+        return {'images': images}
+
+    def apod_feed(self):
+        """APOD形式のフィード（直近 image_count 日分、最初の日は動画）"""
+        today = date.today()
+        entries = []
+        for i in range(self.config.image_count):
+            day = (today - timedelta(days=i)).strftime("%Y-%m-%d")
+            entries.append({
+                'date': day,
+                'title': f"Mock APOD {i}",
+                'copyright': "Benchmark",
+                'media_type': "video" if i == 0 else "image",
+                'url': f"{self.base_url}/apod/image/{day}.jpg",
+                'hdurl': f"{self.base_url}/apod/image/{day}_hd.jpg",
+            })
+        return entries
+
+    def manifest(self):
+        """JSONマニフェスト（相対URL）"""
+        today = date.today()
+        return {'images': [{
+            'id': f"drop{i}",
+            'title': f"Mock drop {i}",
+            'copyright': "Benchmark",
+            'date': (today - timedelta(days=i)).strftime("%Y-%m-%d"),
+            'url': f"images/drop{i}.jpg",
+        } for i in range(self.config.image_count)]}
+
+    def image_bytes(self, image_id, width, height):
+        """合成JPEGを生成（同じIDは2回目以降キャッシュから返す）"""
+        key = (image_id, width, height)
+        with self._lock:
+            cached = self._image_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # ランダムノイズ寄りの画像にして実写と近いJPEGサイズにする
+        seed = sum(image_id.encode('utf-8'))
+        noise = Image.effect_noise((width, height), 64 + seed % 64)
+        image = Image.merge("RGB", (
+            noise,
+            noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+            noise.transpose(Image.Transpose.FLIP_TOP_BOTTOM),
+        ))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.config.quality)
+        data = buffer.getvalue()
+
+        with self._lock:
+            self._image_cache[key] = data
+        return data
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bing API のローカル代替サーバー")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=int, default=0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockBingConfig(args.images, args.width, args.height,
+                            args.latency, args.bandwidth, fail_first=args.fail_first)
+    server = MockBingServer(config, port=args.port)
+    print(f"Mock Bing API: {server.base_url}/HPImageArchive.aspx")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
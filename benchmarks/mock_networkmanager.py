@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+NetworkManager の D-Bus モック
+セッションバスに org.freedesktop.NetworkManager を登録し Metered プロパティだけを返す。
+アプリ側は BINGWALL_NM_BUS=session でこのモックを参照する。
+
+    dbus-run-session -- sh -c 'python3 benchmarks/mock_networkmanager.py --metered yes & \\
+        sleep 1; BINGWALL_NM_BUS=session python3 main.py'
+"""
+
+import argparse
+import sys
+
+from PyQt6.QtCore import QCoreApplication, QObject, pyqtClassInfo, pyqtProperty
+from PyQt6.QtDBus import QDBusConnection
+
+NM_SERVICE = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+
+# NMMetered の値
+METERED_VALUES = {
+    "unknown": 0,
+    "yes": 1,
+    "no": 2,
+    "guess-yes": 3,
+    "guess-no": 4,
+}
+
+
+@pyqtClassInfo("D-Bus Interface", NM_SERVICE)
+class MockNetworkManager(QObject):
+    """Metered プロパティのみを公開する NetworkManager の代役"""
+
+    def __init__(self, metered):
+        super().__init__()
+        self._metered = metered
+
+    @pyqtProperty('uint')
+    def Metered(self):
+        return self._metered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NetworkManager の D-Bus モック")
+    parser.add_argument("--metered", choices=sorted(METERED_VALUES), default="yes")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv[:1])
+    bus = QDBusConnection.sessionBus()
+    if not bus.isConnected():
+        sys.exit("セッションバスに接続できません（dbus-run-session で起動してください）")
+
+    manager = MockNetworkManager(METERED_VALUES[args.metered])
+    if not bus.registerService(NM_SERVICE):
+        sys.exit(f"サービス登録に失敗しました: {bus.lastError().message()}")
+    bus.registerObject(NM_PATH, manager, QDBusConnection.RegisterOption.ExportAllProperties)
+    print(f"Mock NetworkManager: Metered={args.metered}", flush=True)
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
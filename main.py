@@ -6,13 +6,27 @@ Linux Bing Wallpaper - Modern PyQt6 Version
 
 import sys
 import os
+import ctypes
+import argparse
 import requests
+import fcntl
+import functools
+import hashlib
+import io
 import json
+import re
+import random
+import struct
 import subprocess
+import tempfile
 import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse, parse_qs
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QGridLayout,
@@ -23,14 +37,16 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import (
     Qt, QThread, pyqtSignal, QTimer, QPropertyAnimation, 
-    QEasingCurve, QRect, QSize, QSettings, QStandardPaths
+    QEasingCurve, QRect, QSize, QSettings, QStandardPaths,
+    QObject, QCoreApplication, QRunnable, QThreadPool, QFileSystemWatcher, QSocketNotifier
 )
 from PyQt6.QtGui import (
     QPixmap, QIcon, QFont, QPalette, QColor, QAction,
-    QPainter, QBrush, QLinearGradient, QMovie
+    QPainter, QBrush, QLinearGradient, QMovie, QImage, QImageReader
 )
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
 
-from PIL import Image
+from PIL import Image, ImageColor, ImageDraw, ImageFont, ImageOps
 
 # ---------------------------------------------
 # アイコン関連ユーティリティ
@@ -146,67 +162,2316 @@ def create_fallback_icon(size=64):
     painter.end()
     return QIcon(pixmap)
 
+# ---------------------------------------------
+# トレース（計測）ユーティリティ
+# ---------------------------------------------
+# 環境変数 BINGWALL_TRACE に出力先パスを指定するとトレースが有効になる
+# （拡張子 .jsonl なら JSON Lines、それ以外は Chrome trace 形式で終了時に書き出し）
+TRACE_ENV_VAR = "BINGWALL_TRACE"
+TRACE_BUFFER_SIZE = 4096
+
+
+class _NullSpan:
+    """トレース無効時に返す何もしないスパン"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add_bytes(self, count):
+        pass
+
+    def set(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """名前付きの計測区間。終了時にトレーサのリングバッファへ記録する"""
+    __slots__ = ("tracer", "name", "attrs", "start_ns")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.start_ns, end_ns - self.start_ns, self.attrs)
+        return False
+
+    def add_bytes(self, count):
+        """転送・書き込みしたバイト数を加算"""
+        self.attrs['bytes'] = self.attrs.get('bytes', 0) + count
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+
+class Tracer:
+    """取得・デコード・設定処理の所要時間をリングバッファに記録する軽量トレーサ。
+    無効時は span() が共有の _NULL_SPAN を返すだけなのでオーバーヘッドはほぼゼロ。"""
+
+    def __init__(self, capacity=TRACE_BUFFER_SIZE):
+        self.enabled = False
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+
+    def span(self, name, **attrs):
+        """`with tracer.span("fetch.api"):` の形で使う計測区間を返す"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def record(self, name, start_ns, duration_ns, attrs=None):
+        """計測結果を1件記録（バッファが一杯なら古いものから捨てる）"""
+        event = {
+            'name': name,
+            'start_us': (start_ns - self._origin_ns) / 1000,
+            'duration_us': duration_ns / 1000,
+            'thread': threading.get_ident(),
+            'attrs': dict(attrs or {}),
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def events(self):
+        """記録済みイベントのスナップショットを返す"""
+        with self._lock:
+            return list(self._events)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def export_jsonl(self, path):
+        """1行1イベントの JSON Lines 形式で書き出す"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in self.events():
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def export_chrome_trace(self, path):
+        """chrome://tracing / Perfetto で読める Trace Event 形式で書き出す"""
+        pid = os.getpid()
+        trace_events = [{
+            'name': event['name'],
+            'cat': event['name'].split('.', 1)[0],
+            'ph': 'X',
+            'ts': event['start_us'],
+            'dur': event['duration_us'],
+            'pid': pid,
+            'tid': event['thread'],
+            'args': event['attrs'],
+        } for event in self.events()]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace_events}, f, ensure_ascii=False)
+
+    def export(self, path):
+        """拡張子に応じた形式で書き出す"""
+        if str(path).endswith('.jsonl'):
+            self.export_jsonl(path)
+        else:
+            self.export_chrome_trace(path)
+
+
+tracer = Tracer()
+
+# ---------------------------------------------
+# 通信ポリシー（帯域制限・従量制回線・解像度フォールバック）
+# ---------------------------------------------
+# Bing が urlbase に対して提供している解像度（大きい順）
+BING_RESOLUTIONS = ["UHD", "1920x1080", "1366x768", "1280x720", "1024x768", "800x600"]
+DEFAULT_RESOLUTION = "1920x1080"
+DEFAULT_FALLBACK_RESOLUTION = "1366x768"
+
+# 事前見積もり用の解像度ごとの平均的なJPEGサイズ（バイト）
+TYPICAL_IMAGE_BYTES = {
+    "UHD": 3_000_000,
+    "1920x1080": 450_000,
+    "1366x768": 250_000,
+    "1280x720": 200_000,
+    "1024x768": 160_000,
+    "800x600": 100_000,
+}
+
+# この速度（バイト/秒）を下回る回線は低速とみなしてフォールバック解像度を使う
+DEFAULT_SLOW_THRESHOLD = 256 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# NetworkManager の D-Bus 情報（BINGWALL_NM_BUS=session でセッションバスのモックを参照）
+NM_SERVICE = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+NM_BUS_ENV_VAR = "BINGWALL_NM_BUS"
+NM_METERED_YES = (1, 3)  # NM_METERED_YES, NM_METERED_GUESS_YES
+
+
+def detect_metered_connection():
+    """NetworkManager の Metered プロパティから従量制回線かを判定する。
+    判定できない場合（NetworkManager なし・D-Bus 未接続など）は None を返す"""
+    try:
+        from PyQt6.QtDBus import QDBus, QDBusConnection, QDBusMessage
+    except ImportError:
+        return None
+
+    if os.environ.get(NM_BUS_ENV_VAR) == "session":
+        bus = QDBusConnection.sessionBus()
+    else:
+        bus = QDBusConnection.systemBus()
+    if not bus.isConnected():
+        return None
+
+    message = QDBusMessage.createMethodCall(
+        NM_SERVICE, NM_PATH, "org.freedesktop.DBus.Properties", "Get")
+    message.setArguments([NM_SERVICE, "Metered"])
+    reply = bus.call(message, QDBus.CallMode.Block, 1000)
+    if reply.type() != QDBusMessage.MessageType.ReplyMessage or not reply.arguments():
+        return None
+
+    value = reply.arguments()[0]
+    if hasattr(value, 'variant'):
+        value = value.variant()
+    try:
+        return int(value) in NM_METERED_YES
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """帯域制限用のトークンバケット（rate バイト/秒、burst バイトまで貯められる）"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """amount バイト分のトークンを消費し、補充されるまでに待つべき秒数を返す"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def consume(self, amount):
+        """amount バイト分のトークンを消費し、不足していれば補充されるまで待機する"""
+        wait = self.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FetchPolicy:
+    """帯域制限・従量制回線・低速回線に応じてダウンロード方法を決める"""
+
+    def __init__(self, bandwidth_limit=0, resolution=DEFAULT_RESOLUTION,
+                 fallback_resolution=DEFAULT_FALLBACK_RESOLUTION,
+                 slow_threshold=DEFAULT_SLOW_THRESHOLD, metered=None,
+                 reuse_existing=True):
+        self.bucket = TokenBucket(bandwidth_limit, DOWNLOAD_CHUNK_SIZE) if bandwidth_limit else None
+        self.bandwidth_limit = bandwidth_limit
+        self.resolution = resolution
+        self.fallback_resolution = fallback_resolution
+        self.slow_threshold = slow_threshold
+        self.metered = metered
+        self.reuse_existing = reuse_existing
+        self.throughput = None  # 実測スループット（バイト/秒、全ワーカー合計）
+        # 並列ダウンロードは同じ回線を分け合うので、どれかが受信中だった時間と合計バイト数で測る
+        self._meter_lock = threading.Lock()
+        self._receiving = 0
+        self._receiving_since = 0.0
+        self._measured_bytes = 0
+        self._measured_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls, settings, bandwidth_limit=None):
+        """QSettings の network/* から生成。metered は auto/always/never"""
+        metered_mode = settings.value("network/metered", "auto")
+        if metered_mode == "always":
+            metered = True
+        elif metered_mode == "never":
+            metered = False
+        else:
+            metered = detect_metered_connection()
+        if bandwidth_limit is None:
+            bandwidth_limit = int(settings.value("network/bandwidth_limit", 0))
+        return cls(
+            bandwidth_limit=bandwidth_limit,
+            resolution=settings.value("network/resolution", DEFAULT_RESOLUTION),
+            fallback_resolution=settings.value("network/fallback_resolution",
+                                               DEFAULT_FALLBACK_RESOLUTION),
+            slow_threshold=int(settings.value("network/slow_threshold", DEFAULT_SLOW_THRESHOLD)),
+            metered=metered,
+        )
+
+    def is_constrained(self):
+        """従量制・帯域制限・実測が低速のいずれかに該当するか"""
+        if self.metered:
+            return True
+        if self.bandwidth_limit and self.bandwidth_limit < self.slow_threshold:
+            return True
+        return self.throughput is not None and self.throughput < self.slow_threshold
+
+    def current_resolution(self):
+        return self.fallback_resolution if self.is_constrained() else self.resolution
+
+    def image_url(self, base_url, image_data, resolution):
+        """urlbase があれば指定解像度のURLを組み立て、なければ既定の url を使う"""
+        urlbase = image_data.get('urlbase')
+        if resolution == DEFAULT_RESOLUTION or not urlbase:
+            return base_url + image_data['url']
+        return f"{base_url}{urlbase}_{resolution}.jpg"
+
+    def filename(self, date, resolution, market=None):
+        """既定の市場・解像度は従来どおりのファイル名、それ以外は市場・解像度を付ける"""
+        name = f"bing_wallpaper_{date}"
+        # 市場が違えば同じ日付でも別の画像なので、既定以外の市場は名前に含める
+        if market and market != DEFAULT_MARKET:
+            name += f"_{market}"
+        if resolution != DEFAULT_RESOLUTION:
+            name += f"_{resolution}"
+        return f"{name}.jpg"
+
+    @staticmethod
+    def acceptable_resolutions(resolution):
+        """要求した解像度の代わりに使える解像度（高い順）"""
+        if resolution in BING_RESOLUTIONS:
+            return BING_RESOLUTIONS[:BING_RESOLUTIONS.index(resolution) + 1]
+        return [resolution]
+
+    def existing_file(self, wallpaper_dir, date, resolution, market=None):
+        """再利用できるダウンロード済みファイルを探す（要求した解像度以上のみ、高解像度を優先）"""
+        if not self.reuse_existing:
+            return None
+        for candidate in self.acceptable_resolutions(resolution):
+            path = wallpaper_dir / self.filename(date, candidate, market)
+            if path.exists() and path.stat().st_size > 0:
+                return path
+        return None
+
+    def estimate_bytes(self, resolution):
+        """1枚あたりの見込みサイズ"""
+        return TYPICAL_IMAGE_BYTES.get(resolution, TYPICAL_IMAGE_BYTES[DEFAULT_RESOLUTION])
+
+    def throttle(self, amount):
+        if not self.bucket:
+            return
+        wait = self.bucket.reserve(amount)
+        if wait > 0:
+            # 自分で課した帯域制限の待ち時間は回線の実測に含めない（制限は is_constrained で扱う）
+            self.transfer_stopped()
+            try:
+                time.sleep(wait)
+            finally:
+                self.transfer_started()
+
+    def begin_batch(self):
+        """一括取得の開始時に実測をやり直す"""
+        with self._meter_lock:
+            self._measured_bytes = 0
+            self._measured_seconds = 0.0
+
+    def transfer_started(self):
+        with self._meter_lock:
+            if self._receiving == 0:
+                self._receiving_since = time.perf_counter()
+            self._receiving += 1
+
+    def transfer_stopped(self):
+        with self._meter_lock:
+            self._receiving -= 1
+            if self._receiving == 0:
+                self._measured_seconds += time.perf_counter() - self._receiving_since
+
+    def observe(self, size):
+        """ダウンロード実績から、バッチ全体で受信に使った時間あたりのスループットを更新"""
+        with self._meter_lock:
+            self._measured_bytes += size
+            seconds = self._measured_seconds
+            if self._receiving:
+                seconds += time.perf_counter() - self._receiving_since
+            if seconds > 0:
+                self.throughput = self._measured_bytes / seconds
+
+
+# ---------------------------------------------
+# 再試行とサーキットブレーカー
+# ---------------------------------------------
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いていてリクエストを送らなかったことを示す"""
+
+
+class CircuitBreaker:
+    """連続失敗が閾値を超えたら一定時間リクエストを止め、Bingへの連打を防ぐ。
+    closed（通常）→ open（遮断）→ half-open（試しに1回通す）の3状態"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=300.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """リクエスト可否を判定し、遮断中なら CircuitOpenError を送出"""
+        with self._lock:
+            if self.state == "open":
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"Bingへの接続を一時停止中です（{int(remaining) + 1}秒後に再開）")
+                self.state = "half-open"
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+def is_retryable_error(error):
+    """一時的な障害（接続失敗・タイムアウト・5xx・429）かどうか"""
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status >= 500 or status == 429
+    return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+class RetryPolicy:
+    """リクエストごとの指数バックオフ付き再試行"""
+
+    def __init__(self, attempts=3, base_delay=1.0, max_delay=30.0, breaker=None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+
+    def backoff(self, attempt):
+        """attempt 回目の失敗後の待機秒数（ジッター付き）"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def call(self, func, *args, **kwargs):
+        for attempt in range(1, self.attempts + 1):
+            self.breaker.before_request()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable_error(e):
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.attempts:
+                    raise
+                time.sleep(self.backoff(attempt))
+            else:
+                self.breaker.record_success()
+                return result
+
+
+# プロセス内の全フェッチャーで共有するBing用ブレーカー
+bing_circuit_breaker = CircuitBreaker()
+
+# 取得に失敗した壁紙をバックグラウンドで再試行する間隔（秒）
+BACKGROUND_RETRY_DELAYS = [60, 300, 900]
+
+
+# ---------------------------------------------
+# プロセス間の排他と単一インスタンス制御
+# ---------------------------------------------
+FETCH_LOCK_NAME = ".fetch.lock"
+FETCH_LOCK_TIMEOUT = 600  # 他プロセスの取得完了を待つ最大秒数
+SINGLE_INSTANCE_NAME = f"bingwall-{os.getuid()}"
+
+
+def get_wallpaper_dir():
+    """壁紙の保存先フォルダ"""
+    return Path.home() / "Pictures" / "BingWallpapers"
+
+
+def get_base_url(settings):
+    """取得元のベースURL（network/base_url で社内ミラーなどを指定できる）"""
+    return settings.value("network/base_url", BING_BASE_URL) or BING_BASE_URL
+
+
+class FileLock:
+    """fcntl.flock による排他ロック。プロセスが落ちてもOSが自動で解放する"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+
+    def acquire(self, blocking=True, timeout=None):
+        """ロックを取得。blocking=False なら取れなかった時点で False を返し、
+        timeout を過ぎても取れなければ TimeoutError を送出する"""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if not blocking:
+                    return False
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"ロックを取得できませんでした: {self.path}")
+                time.sleep(0.1)
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def _current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# mkstemp は 0600 で作るので、通常のファイルと同じ権限に戻すために使う
+_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def write_file_atomic(path, content):
+    """一時ファイルに書いてから置き換え、途中で切れたファイルが見えないようにする。
+    一時ファイル名は書き込みごとに別にするので、ロックを持たない書き手同士でも衝突しない"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), _FILE_MODE)
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class SingleInstance(QObject):
+    """QLocalServer による単一インスタンス制御。
+    2つ目の起動は既存インスタンスへコマンド（show / fetch）を送って終了する"""
+    command_received = pyqtSignal(str)
+
+    def __init__(self, name=SINGLE_INSTANCE_NAME):
+        super().__init__()
+        self.name = name
+        self.server = None
+        runtime_dir = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.RuntimeLocation) or "/tmp"
+        self.lock_path = Path(runtime_dir) / f"{name}.lock"
+
+    def start(self, command):
+        """既存インスタンスがあればコマンドを転送して False、なければ待ち受けを開始して True"""
+        # 同時起動で両方がサーバーになるのを防ぐため、判定と待ち受けをロックで直列化する
+        with FileLock(self.lock_path):
+            if self.forward(command):
+                return False
+            # 異常終了で残ったソケットを掃除してから待ち受ける
+            QLocalServer.removeServer(self.name)
+            self.server = QLocalServer(self)
+            self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+            self.server.newConnection.connect(self._on_new_connection)
+            if not self.server.listen(self.name):
+                print(f"単一インスタンスの待ち受けに失敗: {self.server.errorString()}")
+        return True
+
+    def forward(self, command):
+        """起動中のインスタンスへコマンドを送信"""
+        socket = QLocalSocket()
+        socket.connectToServer(self.name)
+        if not socket.waitForConnected(1000):
+            return False
+        socket.write((command + "\n").encode('utf-8'))
+        socket.waitForBytesWritten(1000)
+        socket.disconnectFromServer()
+        return True
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self._read_commands(s))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _read_commands(self, socket):
+        while socket.canReadLine():
+            command = bytes(socket.readLine()).decode('utf-8').strip()
+            if command:
+                self.command_received.emit(command)
+
+
+# Bing APIのベースURL（ベンチマークやミラー利用時に差し替え可能）
+BING_BASE_URL = "https://www.bing.com"
+DEFAULT_MARKET = "ja-JP"
+API_PAGE_SIZE = 8  # 1リクエストで取得できる最大枚数
+
+# ---------------------------------------------
+# 画像ソース（プロバイダ）
+# ---------------------------------------------
+# 各ソースは一覧(list_images)・メタデータ(describe)・本体取得(fetch)だけを実装し、
+# 並列ダウンロード・重複排除・サムネイル・インデックスは WallpaperFetcher が共通で行う
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+APOD_API_URL = "https://api.nasa.gov/planetary/apod"
+
+
+def _safe_filename(text):
+    """ファイル名に使えない文字を置き換える"""
+    return re.sub(r"[^0-9A-Za-z._-]+", "_", text).strip("._")[:100] or "image"
+
+
+class ImageSource:
+    """画像ソースの基底クラス"""
+    name = "source"
+    label = "ソース"
+    
+    def __init__(self):
+        self.retry = RetryPolicy()  # ソースごとに独立したサーキットブレーカーを持つ
+        
+    def make_item(self, key, data):
+        return {'source': self.name, 'key': str(key), 'data': data}
+        
+    def list_images(self, fetcher):
+        """取得対象の一覧（make_item で作った辞書のリスト）を返す"""
+        raise NotImplementedError
+        
+    def describe(self, item):
+        """title・copyright・date(YYYYMMDD)・url を返す"""
+        raise NotImplementedError
+        
+    def fetch(self, item, fetcher, resolution):
+        """画像のバイト列、またはローカルにあるファイルの Path を返す"""
+        raise NotImplementedError
+        
+    def filename(self, item, resolution):
+        return f"{self.name}_{_safe_filename(item['key'])}.jpg"
+        
+    def existing_file(self, item, fetcher, resolution):
+        """インデックス導入前のファイルなど、ソース固有の規則で既存ファイルを探す"""
+        return None
+        
+    def resolution_of(self, path):
+        """保存したファイルの解像度（解像度を選べないソースは None）"""
+        return None
+        
+    def request_json(self, fetcher, url):
+        def request():
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            return response
+        with tracer.span("fetch.api", source=self.name) as span:
+            response = (fetcher.retry or self.retry).call(request)
+            span.add_bytes(len(response.content))
+        return response.json()
+
+
+def image_identity(image_data):
+    """市場をまたいで同じ画像を見分けるキー（hsh > urlbase > url の順）"""
+    return image_data.get('hsh') or image_data.get('urlbase') or image_data.get('url')
+
+
+class BingSource(ImageSource):
+    """Bing の HPImageArchive.aspx"""
+    name = "bing"
+    label = "Bing"
+    
+    def __init__(self, base_url=BING_BASE_URL, market=DEFAULT_MARKET):
+        super().__init__()
+        self.retry = RetryPolicy(breaker=bing_circuit_breaker)
+        self.base_url = base_url.rstrip('/')
+        self.market = market
+        
+    def list_images(self, fetcher, idx=0, count=API_PAGE_SIZE):
+        fetcher.progress.emit("Bing APIに接続中...", 0, 0)
+        # Bing公式API（既定は最新8枚の日本語版）
+        data = self.request_json(
+            fetcher,
+            f"{self.base_url}/HPImageArchive.aspx?format=js&idx={idx}&n={count}&mkt={self.market}")
+        items = [self.make_item(image_identity(image_data), image_data)
+                 for image_data in data.get('images') or []]
+        for item in items:
+            item['market'] = self.market
+        return items
+        
+    def describe(self, item):
+        data = item['data']
+        return {
+            'title': data.get('title', '不明'),
+            'copyright': data.get('copyright', ''),
+            'date': data.get('startdate', 'unknown'),
+            'url': self.base_url + data['url'],
+        }
+        
+    def fetch(self, item, fetcher, resolution):
+        return fetcher.download(fetcher.policy.image_url(self.base_url, item['data'], resolution),
+                                self.retry)
+        
+    def filename(self, item, resolution):
+        return FetchPolicy().filename(item['data'].get('startdate', 'unknown'), resolution,
+                                      item.get('market'))
+        
+    def existing_file(self, item, fetcher, resolution):
+        # 従来どおり日付ごとのファイル名で再利用する
+        return fetcher.policy.existing_file(fetcher.wallpaper_dir,
+                                            item['data'].get('startdate', 'unknown'), resolution,
+                                            item.get('market'))
+        
+    def resolution_of(self, path):
+        # 既定解像度以外はファイル名の末尾に付いている
+        suffix = Path(path).stem.rsplit('_', 1)[-1]
+        return suffix if suffix in BING_RESOLUTIONS else DEFAULT_RESOLUTION
+
+
+class FolderSource(ImageSource):
+    """ローカルフォルダ内の画像（コピーせずそのまま使う）"""
+    name = "folder"
+    label = "フォルダ"
+    
+    def __init__(self, folder):
+        super().__init__()
+        self.folder = Path(folder).expanduser()
+        
+    def list_images(self, fetcher):
+        if not self.folder.is_dir():
+            raise FileNotFoundError(f"フォルダが見つかりません: {self.folder}")
+        items = []
+        for path in sorted(self.folder.iterdir()):
+            if path.suffix.lower() in IMAGE_EXTENSIONS and path.is_file():
+                items.append(self.make_item(path.name, {'path': str(path)}))
+        return items
+        
+    def describe(self, item):
+        path = Path(item['data']['path'])
+        date = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y%m%d")
+        return {'title': path.stem, 'copyright': '', 'date': date, 'url': path.as_uri()}
+        
+    def fetch(self, item, fetcher, resolution):
+        return Path(item['data']['path'])
+
+
+class ApodSource(ImageSource):
+    """NASA APOD 形式のJSONフィード（直近 count 日分）"""
+    name = "apod"
+    label = "APOD"
+    
+    def __init__(self, api_url=APOD_API_URL, api_key="DEMO_KEY", count=API_PAGE_SIZE):
+        super().__init__()
+        self.api_url = api_url
+        self.api_key = api_key
+        self.count = count
+        
+    def list_images(self, fetcher):
+        start = datetime.fromtimestamp(time.time() - (self.count - 1) * 86400).strftime("%Y-%m-%d")
+        data = self.request_json(fetcher, f"{self.api_url}?api_key={self.api_key}&start_date={start}")
+        entries = data if isinstance(data, list) else [data]
+        # 動画の日は除外
+        return [self.make_item(entry['date'], entry) for entry in entries
+                if entry.get('media_type', 'image') == 'image' and entry.get('url')]
+        
+    def describe(self, item):
+        data = item['data']
+        return {
+            'title': data.get('title', '不明'),
+            'copyright': data.get('copyright', '').strip(),
+            'date': data.get('date', 'unknown').replace('-', ''),
+            'url': data.get('hdurl') or data['url'],
+        }
+        
+    def fetch(self, item, fetcher, resolution):
+        data = item['data']
+        # 通信が制約されている間は hdurl ではなく通常サイズを使う
+        url = data['url'] if fetcher.policy.is_constrained() else data.get('hdurl') or data['url']
+        return fetcher.download(url, self.retry)
+
+
+class ManifestSource(ImageSource):
+    """社内の画像置き場など、JSONマニフェスト（{"images": [{id, title, url, ...}]}）で公開された画像"""
+    name = "manifest"
+    label = "マニフェスト"
+    
+    def __init__(self, manifest_url):
+        super().__init__()
+        self.manifest_url = manifest_url
+        
+    def list_images(self, fetcher):
+        data = self.request_json(fetcher, self.manifest_url)
+        return [self.make_item(entry.get('id') or entry['url'], entry)
+                for entry in data.get('images') or [] if entry.get('url')]
+        
+    def describe(self, item):
+        data = item['data']
+        return {
+            'title': data.get('title', item['key']),
+            'copyright': data.get('copyright', ''),
+            'date': str(data.get('date', 'unknown')).replace('-', ''),
+            # 相対URLはマニフェストの位置を基準に解決
+            'url': urljoin(self.manifest_url, data['url']),
+        }
+        
+    def fetch(self, item, fetcher, resolution):
+        return fetcher.download(self.describe(item)['url'], self.retry)
+
+
+ARCHIVE_SOURCE = "archive"  # 壁紙フォルダに直接置かれた画像
+SOURCE_LABELS = {source.name: source.label
+                 for source in (BingSource, FolderSource, ApodSource, ManifestSource)}
+SOURCE_LABELS[ARCHIVE_SOURCE] = "手動追加"
+
+
+def create_sources(settings):
+    """QSettings の sources/enabled（カンマ区切り）から有効なソースを生成"""
+    enabled = settings.value("sources/enabled", "bing")
+    sources = []
+    for name in (n.strip() for n in enabled.split(",")):
+        if name == "bing":
+            sources.append(BingSource(get_base_url(settings)))
+        elif name == "folder" and settings.value("sources/folder_path", ""):
+            sources.append(FolderSource(settings.value("sources/folder_path")))
+        elif name == "apod":
+            sources.append(ApodSource(settings.value("sources/apod_url", APOD_API_URL),
+                                      settings.value("sources/apod_api_key", "DEMO_KEY")))
+        elif name == "manifest" and settings.value("sources/manifest_url", ""):
+            sources.append(ManifestSource(settings.value("sources/manifest_url")))
+    return sources or [BingSource(get_base_url(settings))]
+
+
+# ---------------------------------------------
+# 取得済み画像のインデックスとサムネイル
+# ---------------------------------------------
+INDEX_FILE_NAME = ".index.json"
+INDEX_JOURNAL_NAME = ".index.journal"
+INDEX_JOURNAL_LIMIT = 1000  # 追記がこの行数を超えたら本体を書き直す
+DOWNLOAD_WORKERS = 4
+THUMBNAIL_QUALITY = 85
+
+
+def get_thumbnail_dir():
+    return get_cache_dir() / "thumbnails"
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remove_thumbnail(sha1):
+    (get_thumbnail_dir() / f"{sha1}.jpg").unlink(missing_ok=True)
+
+
+def make_thumbnail(image_path, sha1):
+    """ギャラリー用の縮小画像を内容ハッシュ名で保存（既にあれば再生成しない）"""
+    thumbnail_path = get_thumbnail_dir() / f"{sha1}.jpg"
+    if thumbnail_path.exists():
+        return thumbnail_path
+    with tracer.span("fetch.thumbnail"):
+        with Image.open(image_path) as image:
+            # JPEGはdraftでデコード時に縮小させる
+            image.draft("RGB", (TILE_SIZE[0] * 2, TILE_SIZE[1] * 2))
+            image = image.convert("RGB")
+            image.thumbnail(TILE_SIZE, Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=THUMBNAIL_QUALITY)
+    # 同じ画像を複数スレッドが同時に処理しても一時ファイルが衝突しないよう原子的に書き込む
+    thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+    write_file_atomic(thumbnail_path, buffer.getvalue())
+    return thumbnail_path
+
+
+class WallpaperIndex:
+    """壁紙フォルダの .index.json。ソースごとの取得済み画像と内容ハッシュを記録し、
+    同じ画像を別ソース・別キーで取得しても1ファイルにまとめる。
+    少数の変更は .index.journal に追記し（save_changes）、save で本体にまとめて書き直す"""
+    
+    def __init__(self, wallpaper_dir):
+        self.path = Path(wallpaper_dir) / INDEX_FILE_NAME
+        self.journal_path = Path(wallpaper_dir) / INDEX_JOURNAL_NAME
+        self._lock = threading.Lock()
+        self.reload()
+        
+    def _signature(self):
+        signature = []
+        for path in (self.path, self.journal_path):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+        
+    def reload(self):
+        with self._lock:
+            signature = self._signature()
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            self.entries = data.get('entries', {})
+            self.hashes = data.get('hashes', {})
+            # 追記された変更を順に当てる（書きかけの行は無視）
+            self._journal_lines = 0
+            try:
+                with open(self.journal_path, encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._apply_record(record)
+                        self._journal_lines += 1
+            except OSError:
+                pass
+            # パスから引けるようにしておく（重複排除で複数のエントリが同じファイルを指すことがある）
+            self._by_path = {}
+            self._by_sha1 = {}
+            for key, entry in self.entries.items():
+                self._by_path.setdefault(entry['path'], set()).add(key)
+                if entry.get('sha1'):
+                    self._by_sha1.setdefault(entry['sha1'], set()).add(key)
+            self._dirty_keys = set()
+            self._dirty_hashes = set()
+            self._signature_cache = signature
+            
+    def _apply_record(self, record):
+        if 'key' in record:
+            if record['entry'] is None:
+                self.entries.pop(record['key'], None)
+            else:
+                self.entries[record['key']] = record['entry']
+        elif 'sha1' in record:
+            if record['path'] is None:
+                self.hashes.pop(record['sha1'], None)
+            else:
+                self.hashes[record['sha1']] = record['path']
+            
+    def reload_if_changed(self):
+        """他のプロセスや取得ワーカーが保存していれば読み直す"""
+        if self._signature() != self._signature_cache:
+            self.reload()
+        
+    @staticmethod
+    def entry_key(source, key):
+        return f"{source}:{key}"
+        
+    def lookup(self, source, key):
+        """ファイルが残っている登録済みエントリを返す"""
+        with self._lock:
+            entry = self.entries.get(self.entry_key(source, key))
+        if entry and Path(entry['path']).exists():
+            return entry
+        return None
+        
+    def find_hash(self, sha1):
+        with self._lock:
+            path = self.hashes.get(sha1)
+        if path and Path(path).exists():
+            return path
+        return None
+        
+    def entries_for_path(self, path):
+        with self._lock:
+            return [self.entries[key] for key in self._by_path.get(str(path), ())]
+        
+    def add(self, entry):
+        with self._lock:
+            key = self.entry_key(entry['source'], entry['key'])
+            old = self.entries.get(key)
+            if old is not None:
+                self._by_path.get(old['path'], set()).discard(key)
+            self.entries[key] = entry
+            self._by_path.setdefault(entry['path'], set()).add(key)
+            self._dirty_keys.add(key)
+            if entry.get('sha1'):
+                self._by_sha1.setdefault(entry['sha1'], set()).add(key)
+            if entry.get('sha1') and entry['sha1'] not in self.hashes:
+                self.hashes[entry['sha1']] = entry['path']
+                self._dirty_hashes.add(entry['sha1'])
+                
+    def remove_path(self, path):
+        """ファイルを指すエントリを削除し、どこからも参照されなくなった内容ハッシュを返す"""
+        path = str(path)
+        with self._lock:
+            keys = self._by_path.pop(path, set())
+            removed = [self.entries.pop(key) for key in keys]
+            self._dirty_keys.update(keys)
+            return [sha1 for sha1 in {entry.get('sha1') for entry in removed} if sha1
+                    and not self._repoint_hash(sha1, path)]
+            
+    def move_path(self, old_path, new_path):
+        """名前変更に合わせてエントリのパスを付け替え、更新したエントリを返す"""
+        old_path, new_path = str(old_path), str(new_path)
+        with self._lock:
+            keys = self._by_path.pop(old_path, set())
+            self._by_path.setdefault(new_path, set()).update(keys)
+            self._dirty_keys.update(keys)
+            moved = [self.entries[key] for key in keys]
+            for entry in moved:
+                entry['path'] = new_path
+                if self.hashes.get(entry.get('sha1')) == old_path:
+                    self.hashes[entry['sha1']] = new_path
+                    self._dirty_hashes.add(entry['sha1'])
+            return moved
+            
+    def release_hash(self, sha1, path):
+        """内容が変わったファイルの旧ハッシュを外し、参照が残っていなければ True"""
+        with self._lock:
+            return not self._repoint_hash(sha1, str(path))
+        
+    def _repoint_hash(self, sha1, path):
+        # 同じ内容の別ファイルがあればそちらを指し直す（ロック取得済みで呼ぶ）
+        self._dirty_hashes.add(sha1)
+        keys = self._by_sha1.get(sha1, set())
+        for key in list(keys):
+            entry = self.entries.get(key)
+            if entry is None or entry.get('sha1') != sha1:
+                keys.discard(key)  # 削除済み・内容が変わったエントリ
+            elif entry['path'] != path:
+                if self.hashes.get(sha1) == path:
+                    self.hashes[sha1] = entry['path']
+                return True
+        self._by_sha1.pop(sha1, None)
+        self.hashes.pop(sha1, None)
+        return False
+                
+    def save(self):
+        """全体を書き直して追記分をまとめる"""
+        with self._lock:
+            body = json.dumps({'entries': self.entries, 'hashes': self.hashes},
+                              ensure_ascii=False)
+            write_file_atomic(self.path, body.encode('utf-8'))
+            self.journal_path.unlink(missing_ok=True)
+            self._journal_lines = 0
+            self._dirty_keys.clear()
+            self._dirty_hashes.clear()
+            self._signature_cache = self._signature()
+            
+    def save_changes(self):
+        """変更のあったエントリだけを追記する（溜まりすぎたら全体を書き直す）"""
+        with self._lock:
+            records = [{'key': key, 'entry': self.entries.get(key)} for key in self._dirty_keys]
+            records += [{'sha1': sha1, 'path': self.hashes.get(sha1)} for sha1 in self._dirty_hashes]
+            compact = self._journal_lines + len(records) > INDEX_JOURNAL_LIMIT
+        if compact:
+            self.save()
+            return
+        if not records:
+            return
+        with self._lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(record, ensure_ascii=False) + "\n"
+                                for record in records))
+            self._journal_lines += len(records)
+            self._dirty_keys.clear()
+            self._dirty_hashes.clear()
+            self._signature_cache = self._signature()
+
+
 class WallpaperFetcher(QThread):
-    """壁紙取得用ワーカースレッド"""
+    """壁紙取得用ワーカースレッド（全ソース共通の取得パイプライン）。
+    取得できた壁紙から順に wallpaper_ready で通知し、失敗分は finished の 'failed' で返す"""
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
-    progress = pyqtSignal(str)
+    progress = pyqtSignal(str, 'qint64', 'qint64')  # メッセージ, 見込みバイト数, 転送済みバイト数
+    wallpaper_ready = pyqtSignal(dict)
     
-    def __init__(self, wallpaper_dir):
+    def __init__(self, wallpaper_dir, base_url=BING_BASE_URL, policy=None, retry=None,
+                 images=None, sources=None, workers=DOWNLOAD_WORKERS):
         super().__init__()
-        self.wallpaper_dir = wallpaper_dir
+        self.wallpaper_dir = Path(wallpaper_dir)
+        self.base_url = base_url.rstrip('/')
+        self.policy = policy or FetchPolicy()
+        self.retry = retry  # 指定時は全ソースでこの再試行ポリシーを使う
+        self.images = images  # 指定時は一覧を取らずにこの画像だけを取得（再試行用）
+        self.sources = {source.name: source for source in (sources or [BingSource(self.base_url)])}
+        self.workers = workers
         
     def run(self):
         try:
-            self.progress.emit("Bing APIに接続中...")
+            # 他プロセス（別インスタンスやcron）と同時にダウンロードしないよう排他する
+            lock = FileLock(self.wallpaper_dir / FETCH_LOCK_NAME)
+            if not lock.acquire(blocking=False):
+                self.progress.emit("他のプロセスが取得中のため待機しています...", 0, 0)
+                with tracer.span("fetch.lock_wait"):
+                    lock.acquire(timeout=FETCH_LOCK_TIMEOUT)
+            try:
+                result = self.fetch_all()
+            finally:
+                lock.release()
             
-            # Bing公式API（8枚取得日本語版から）
-            api_url = "https://www.bing.com/HPImageArchive.aspx?format=js&idx=0&n=8&mkt=ja-JP"
+            self.finished.emit(result)
             
-            response = requests.get(api_url, timeout=10)
-            response.raise_for_status()
+        except Exception as e:
+            self.error.emit(str(e))
             
-            data = response.json()
-            if not data.get('images'):
-                raise Exception("壁紙データが見つかりません")
+    def fetch_all(self):
+        """壁紙を取得（待機中に他プロセスが保存したファイルは再利用される）"""
+        with tracer.span("fetch.run") as run_span:
+            if self.images is None:
+                images = self.list_all()
+            else:
+                images = self.images
             
-            wallpapers = []
-            for i, image_data in enumerate(data['images']):
-                self.progress.emit(f"壁紙 {i+1}/8 をダウンロード中...")
+            wallpapers, failed, transferred, metrics = self.download_images(images)
+            run_span.add_bytes(transferred)
+            run_span.set('count', len(wallpapers))
+            run_span.set('failed', len(failed))
+            self.progress.emit(f"{len(wallpapers)}枚の壁紙を取得しました", transferred, transferred)
+        
+        return {'wallpapers': wallpapers, 'failed': failed, 'metrics': metrics}
+            
+    def list_all(self):
+        """全ソースの一覧をまとめる（一部のソースが落ちていても他は続行）"""
+        images = []
+        errors = []
+        for source in self.sources.values():
+            try:
+                images.extend(source.list_images(self))
+            except Exception as e:
+                print(f"{source.label} の一覧取得に失敗: {e}")
+                errors.append(e)
+        if not images:
+            if errors:
+                raise errors[0]
+            raise Exception("壁紙データが見つかりません")
+        return images
+        
+    def download_images(self, images):
+        """一覧の画像を並列に取得・保存し、(取得できた壁紙, 失敗した画像, 転送バイト数, ソース別の計測値) を返す"""
+        index = WallpaperIndex(self.wallpaper_dir)
+        self.policy.begin_batch()
+        metrics = {}
+        metrics_lock = threading.Lock()
+        
+        def record(source_name, size, seconds, ok):
+            with metrics_lock:
+                entry = metrics.setdefault(source_name, {
+                    'images': 0, 'failed': 0, 'bytes': 0, 'seconds': 0.0})
+                entry['images' if ok else 'failed'] += 1
+                entry['bytes'] += size
+                entry['seconds'] += seconds
+        
+        # このバッチで書き込んだ内容ハッシュ -> ファイルパス
+        claimed = {}
+        sha1_locks = {}
+        claims_lock = threading.Lock()
+        
+        def process(item):
+            source = self.sources[item['source']]
+            resolution = self.policy.current_resolution()
+            info = source.describe(item)
+            
+            # インデックスやソース固有の規則でダウンロード済みと分かれば再利用
+            if self.policy.reuse_existing:
+                entry = index.lookup(source.name, item['key'])
+                # 解像度を選べるソースでは、要求より低い解像度のファイルは使い回さない
+                if entry is not None and (entry.get('resolution') is None or entry['resolution']
+                                          in self.policy.acceptable_resolutions(resolution)):
+                    return info, entry, 0
+            file_path = source.existing_file(item, self, resolution)
+            content = None
+            started = time.perf_counter()
+            if file_path is None:
+                with tracer.span("fetch.download", source=source.name, date=info['date'],
+                                 resolution=resolution) as span:
+                    fetched = source.fetch(item, self, resolution)
+                    if isinstance(fetched, Path):
+                        file_path = fetched
+                    else:
+                        content = fetched
+                        span.add_bytes(len(content))
+            elapsed = time.perf_counter() - started
+            
+            sha1 = hashlib.sha1(content).hexdigest() if content is not None else file_sha1(file_path)
+            
+            # インデックスへの登録は取得完了後なので、同じ内容の書き込みとサムネイル作成は
+            # ハッシュごとのロックで直列化し、同じバッチ内の重複もここで検出する
+            with claims_lock:
+                sha1_lock = sha1_locks.setdefault(sha1, threading.Lock())
+            with sha1_lock:
+                if content is not None:
+                    # 内容が同じ画像が既にあれば新しいファイルを作らない
+                    file_path = index.find_hash(sha1) if self.policy.reuse_existing else None
+                    if file_path is None:
+                        file_path = claimed.get(sha1)
+                    if file_path is None:
+                        file_path = self.wallpaper_dir / source.filename(item, resolution)
+                        with tracer.span("fetch.write", date=info['date']) as span:
+                            write_file_atomic(file_path, content)
+                            span.add_bytes(len(content))
+                        claimed[sha1] = file_path
+                try:
+                    thumbnail = str(make_thumbnail(file_path, sha1))
+                except Exception as e:
+                    print(f"サムネイル作成失敗 {file_path}: {e}")
+                    thumbnail = None
+            stat = Path(file_path).stat()
+            entry = {
+                'source': source.name, 'key': item['key'], 'path': str(file_path),
+                'sha1': sha1, 'thumbnail': thumbnail,
+                'title': info['title'], 'copyright': info['copyright'], 'date': info['date'],
+                'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                'resolution': source.resolution_of(file_path),
+            }
+            # 書き込みや stat で失敗した場合は呼び出し側で失敗として数える
+            record(source.name, len(content or b""), elapsed, True)
+            return info, entry, len(content or b"")
+        
+        transferred = 0
+        downloaded = 0
+        estimated = self.policy.estimate_bytes(self.policy.current_resolution()) * len(images)
+        results = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            futures = {executor.submit(process, item): i for i, item in enumerate(images)}
+            for done, future in enumerate(as_completed(futures), 1):
+                item = images[futures[future]]
+                try:
+                    info, entry, size = future.result()
+                except Exception as e:
+                    # 失敗しても残りの壁紙は続行
+                    print(f"壁紙のダウンロード失敗 {item['source']}:{item['key']}: {e}")
+                    record(item['source'], 0, 0.0, False)
+                    failed.append(item)
+                    continue
+                index.add(entry)
+                if size:
+                    transferred += size
+                    downloaded += 1
+                
+                # 実績から残りの見込みを更新
+                remaining = len(images) - done
+                if downloaded:
+                    per_image = transferred / downloaded
+                else:
+                    per_image = self.policy.estimate_bytes(self.policy.current_resolution())
+                estimated = transferred + int(per_image * remaining)
+                self.progress.emit(f"壁紙 {done}/{len(images)} を取得しました", estimated, transferred)
                 
-                image_url = "https://www.bing.com" + image_data['url']
-                title = image_data.get('title', '不明')
-                copyright_info = image_data.get('copyright', '')
-                date = image_data.get('startdate', 'unknown')
+                wallpaper = {
+                    'path': entry['path'],
+                    'title': info['title'],
+                    'copyright': info['copyright'],
+                    'date': info['date'],
+                    'url': info['url'],
+                    'source': entry['source'],
+                    'thumbnail': entry['thumbnail'],
+                }
+                results[futures[future]] = wallpaper
+                self.wallpaper_ready.emit(wallpaper)
+        index.save()
+        
+        for entry in metrics.values():
+            entry['bytes_per_second'] = entry['bytes'] / entry['seconds'] if entry['seconds'] else 0.0
+        wallpapers = [results[i] for i in sorted(results)]
+        return wallpapers, failed, transferred, metrics
+            
+    def download(self, url, retry=None):
+        """帯域制限を守りながら画像をストリーミング取得する（一時的な失敗は再試行）"""
+        return (self.retry or retry or RetryPolicy()).call(self._download, url)
+        
+    def _download(self, url):
+        chunks = []
+        self.policy.transfer_started()
+        try:
+            with requests.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    self.policy.throttle(len(chunk))
+                    chunks.append(chunk)
+        finally:
+            self.policy.transfer_stopped()
+        content = b"".join(chunks)
+        self.policy.observe(len(content))
+        return content
+
+
+def create_fetcher(wallpaper_dir, settings, images=None):
+    """QSettings の sources/* と network/* から取得ワーカーを生成"""
+    return WallpaperFetcher(
+        wallpaper_dir, base_url=get_base_url(settings),
+        policy=FetchPolicy.from_settings(settings), images=images,
+        sources=create_sources(settings),
+        workers=int(settings.value("network/workers", DOWNLOAD_WORKERS)))
+
+# ---------------------------------------------
+# 過去の壁紙のバックフィル
+# ---------------------------------------------
+BACKFILL_CHECKPOINT_NAME = ".backfill.json"
+BACKFILL_MARKETS = ["ja-JP"]
+BACKFILL_BANDWIDTH_LIMIT = 256 * 1024  # 通常の取得を邪魔しないよう帯域を絞る（バイト/秒）
+BACKFILL_PAGE_INTERVAL = 5.0  # ページ間の待機秒数
+BACKFILL_MAX_IDX = 10000  # 無限ループ防止の上限
+
+
+class BackfillCrawler(WallpaperFetcher):
+    """idx をずらしながら過去の壁紙を遡って取得するクローラー。
+    市場ごとの進捗をチェックポイントに保存するので、中断しても続きから再開できる"""
+    
+    def __init__(self, wallpaper_dir, markets=None, base_url=BING_BASE_URL, policy=None,
+                 retry=None, page_interval=BACKFILL_PAGE_INTERVAL, max_idx=BACKFILL_MAX_IDX):
+        super().__init__(wallpaper_dir, base_url=base_url,
+                         policy=policy or FetchPolicy(bandwidth_limit=BACKFILL_BANDWIDTH_LIMIT),
+                         retry=retry)
+        self.markets = markets or BACKFILL_MARKETS
+        self.page_interval = page_interval
+        self.max_idx = max_idx
+        self.checkpoint_path = Path(wallpaper_dir) / BACKFILL_CHECKPOINT_NAME
+        self._stop_event = threading.Event()
+        
+    def stop(self):
+        """現在のページを終えたところで停止する"""
+        self._stop_event.set()
+        
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            checkpoint = {}
+        checkpoint.setdefault('markets', {})
+        checkpoint.setdefault('seen', [])
+        return checkpoint
+        
+    def save_checkpoint(self, checkpoint):
+        write_file_atomic(self.checkpoint_path,
+                          json.dumps(checkpoint, ensure_ascii=False).encode('utf-8'))
+        
+    def run(self):
+        try:
+            # 低優先度で動かす（Linuxではスレッド単位のnice値を設定できる）
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+            except (AttributeError, OSError):
+                pass
+            
+            with tracer.span("backfill.run") as run_span:
+                result = self.crawl()
+                run_span.set('count', len(result['wallpapers']))
+            self.finished.emit(result)
+        except Exception as e:
+            self.error.emit(str(e))
+            
+    def crawl(self):
+        # 途中で低解像度に切り替わると、既出扱いになった画像が低解像度のまま残るので
+        # 開始時点の解像度で固定する（帯域制限による遅さを低速回線と誤認させない）
+        resolution = self.policy.current_resolution()
+        self.policy.resolution = self.policy.fallback_resolution = resolution
+        checkpoint = self.load_checkpoint()
+        seen = set(checkpoint['seen'])
+        wallpapers = []
+        failed = []
+        
+        def download(images):
+            # 通常の取得とはページ単位でロックを譲り合う
+            with FileLock(self.wallpaper_dir / FETCH_LOCK_NAME):
+                page_wallpapers, page_failed, _, _ = self.download_images(images)
+            wallpapers.extend(page_wallpapers)
+            failed.extend(page_failed)
+            return page_failed
+        
+        # 前回失敗した画像を先に取り直す（旧形式のAPIデータはBingの項目に変換）
+        bing = self.sources[BingSource.name]
+        retry_images = [image if 'source' in image else bing.make_item(image_identity(image), image)
+                        for image in checkpoint.pop('failed', [])]
+        if retry_images:
+            checkpoint['failed'] = download(retry_images)
+        
+        for market in self.markets:
+            state = checkpoint['markets'].setdefault(market, {'next_idx': 0, 'done': False})
+            while not state['done'] and not self._stop_event.is_set():
+                idx = state['next_idx']
+                with tracer.span("backfill.page", market=market, idx=idx):
+                    images = BingSource(self.base_url, market).list_images(self, idx=idx)
                 
-                # 画像をダウンロード
-                img_response = requests.get(image_url, timeout=30)
-                img_response.raise_for_status()
+                # 重なったウィンドウや他市場で取得済みの画像は除外（同じ日付でも市場が違えば別の画像）。
+                # 内容が同じ画像は取得処理のハッシュ比較でまとめられる
+                unseen = [image for image in images if image['key'] not in seen]
+                seen.update(image['key'] for image in unseen)
+                if unseen:
+                    checkpoint.setdefault('failed', []).extend(download(unseen))
                 
-                # ファイル名を生成
-                filename = f"bing_wallpaper_{date}.jpg"
-                file_path = self.wallpaper_dir / filename
+                # 空のページ・全て既出のページ（Bingは古いidxで同じ窓を返す）・端数ページで終了
+                state['next_idx'] = idx + len(images)
+                if (not unseen or len(images) < API_PAGE_SIZE
+                        or state['next_idx'] >= self.max_idx):
+                    state['done'] = True
                 
-                # 画像を保存
-                with open(file_path, 'wb') as f:
-                    f.write(img_response.content)
+                checkpoint['seen'] = sorted(seen)
+                checkpoint.pop('dates', None)  # 旧形式の日付一覧は使わない
+                self.save_checkpoint(checkpoint)
+                self.progress.emit(f"過去の壁紙を取得中 ({market}, idx={state['next_idx']})",
+                                   0, 0)
                 
-                wallpapers.append({
-                    'path': str(file_path),
-                    'title': title,
-                    'copyright': copyright_info,
-                    'date': date,
-                    'url': image_url
+                if not state['done']:
+                    self._stop_event.wait(self.page_interval)
+        
+        self.save_checkpoint(checkpoint)
+        return {'wallpapers': wallpapers, 'failed': failed}
+
+
+def create_backfill_crawler(wallpaper_dir, settings):
+    """QSettings の backfill/markets（カンマ区切り）と backfill/bandwidth_limit から生成"""
+    markets = settings.value("backfill/markets", ",".join(BACKFILL_MARKETS))
+    bandwidth_limit = int(settings.value("backfill/bandwidth_limit", BACKFILL_BANDWIDTH_LIMIT))
+    return BackfillCrawler(
+        wallpaper_dir, markets=[m.strip() for m in markets.split(",") if m.strip()],
+        base_url=get_base_url(settings),
+        policy=FetchPolicy.from_settings(settings, bandwidth_limit=bandwidth_limit))
+
+
+# ---------------------------------------------
+# LANミラー（Bing互換のキャッシュプロキシ）
+# ---------------------------------------------
+MIRROR_DEFAULT_HOST = "0.0.0.0"
+MIRROR_DEFAULT_PORT = 8765
+MIRROR_API_TTL = 3600  # APIレスポンスを上流に問い合わせ直すまでの秒数
+MIRROR_CACHE_DIR_NAME = ".mirror"
+
+# /th?id= の画像IDを urlbase 部分と解像度に分解する
+_MIRROR_IMAGE_ID_PATTERN = re.compile(r"^(?P<base>.+)_(?P<resolution>UHD|\d+x\d+)\.jpg$")
+
+
+class _MirrorHandler(BaseHTTPRequestHandler):
+    """HPImageArchive.aspx と /th?id= をミラーのキャッシュから返す"""
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        try:
+            if parsed.path == "/HPImageArchive.aspx":
+                body = self.server.mirror.archive_response(
+                    int(query.get('idx', ['0'])[0]),
+                    int(query.get('n', ['1'])[0]),
+                    query.get('mkt', [DEFAULT_MARKET])[0])
+                self._send_bytes(body, "application/json; charset=utf-8",
+                                 f"public, max-age={MIRROR_API_TTL}")
+            elif parsed.path == "/th" and 'id' in query:
+                path = self.server.mirror.image_path(query['id'][0])
+                if path is None:
+                    self._send_error(404)
+                else:
+                    self._send_file(path)
+            else:
+                self._send_error(404)
+        except (ValueError, KeyError):
+            self._send_error(400)
+        except requests.RequestException as e:
+            print(f"ミラー: 上流の取得に失敗 {self.path}: {e}")
+            self._send_error(502)
+        except CircuitOpenError:
+            self._send_error(503)
+    
+    def _not_modified(self, etag):
+        """If-None-Match が一致すれば 304 を返して True"""
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        return False
+    
+    def _send_bytes(self, body, content_type, cache_control):
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self._not_modified(etag):
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_file(self, path):
+        # 画像は日付ごとに内容が変わらないので stat 情報からETagを作る
+        stat = path.stat()
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        if self._not_modified(etag):
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(stat.st_size))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "public, max-age=86400")
+        self.end_headers()
+        with open(path, 'rb') as f:
+            while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+                self.wfile.write(chunk)
+    
+    def _send_error(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class WallpaperMirror:
+    """ダウンロード済みアーカイブを Bing 互換の形で配信するキャッシュプロキシ。
+    同じリソースへの同時リクエストは1回の上流取得にまとめる"""
+    
+    def __init__(self, wallpaper_dir, upstream=BING_BASE_URL, api_ttl=MIRROR_API_TTL,
+                 retry=None):
+        self.wallpaper_dir = Path(wallpaper_dir)
+        self.upstream = upstream.rstrip('/')
+        self.api_ttl = api_ttl
+        self.retry = retry or RetryPolicy(breaker=bing_circuit_breaker)
+        self.cache_dir = self.wallpaper_dir / MIRROR_CACHE_DIR_NAME
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.naming = FetchPolicy()
+        self.upstream_requests = 0
+        self.index = WallpaperIndex(self.wallpaper_dir)
+        self._urlbase_images = {}  # urlbase -> (APIの画像データ, 市場)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._archive_lock = threading.Lock()
+        for cached in self.cache_dir.glob("api-*.json"):
+            # api-<市場>-<idx>-<n>.json（市場自体に - を含む）
+            market = "-".join(cached.stem.split("-")[1:-2])
+            self._index_images(cached.read_bytes(), market)
+    
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+    
+    def _index_images(self, body, market):
+        """APIレスポンスから urlbase → (画像データ, 市場) の対応を覚える"""
+        try:
+            images = json.loads(body).get('images') or []
+        except ValueError:
+            return
+        for image_data in images:
+            if image_data.get('urlbase') and image_data.get('startdate'):
+                self._urlbase_images[image_data['urlbase']] = (image_data, market)
+    
+    def _get_upstream(self, path):
+        def request():
+            response = requests.get(self.upstream + path, timeout=30)
+            response.raise_for_status()
+            return response.content
+        with self._locks_guard:
+            self.upstream_requests += 1
+        with tracer.span("mirror.upstream") as span:
+            content = self.retry.call(request)
+            span.add_bytes(len(content))
+        return content
+    
+    def archive_response(self, idx, n, market):
+        """HPImageArchive.aspx のJSON。TTL内ならキャッシュを返す"""
+        n = max(1, min(n, API_PAGE_SIZE))
+        cache_path = self.cache_dir / f"api-{market}-{idx}-{n}.json"
+        with self._lock_for(cache_path):
+            if cache_path.exists() and time.time() - cache_path.stat().st_mtime < self.api_ttl:
+                return cache_path.read_bytes()
+            try:
+                body = self._get_upstream(
+                    f"/HPImageArchive.aspx?format=js&idx={idx}&n={n}&mkt={market}")
+            except (requests.RequestException, CircuitOpenError):
+                # 上流が落ちていても古いキャッシュがあれば返す
+                if cache_path.exists():
+                    return cache_path.read_bytes()
+                raise
+            write_file_atomic(cache_path, body)
+            self._index_images(body, market)
+            return body
+    
+    def image_path(self, image_id):
+        """画像IDに対応するローカルファイル。無ければ上流から1回だけ取得して保存する"""
+        match = _MIRROR_IMAGE_ID_PATTERN.match(image_id)
+        if not match or '/' in image_id:
+            return None
+        resolution = match.group('resolution')
+        known = self._urlbase_images.get(f"/th?id={match.group('base')}")
+        cache_path = self.cache_dir / "images" / image_id
+        
+        with self._lock_for(image_id):
+            archive_path = None
+            if known:
+                # アーカイブ（アプリ本体の保存先）と同じ、日付・市場・解像度で決まるファイル名で共有する
+                image_data, market = known
+                archive_path = self.wallpaper_dir / self.naming.filename(
+                    image_data['startdate'], resolution, market)
+                if archive_path.exists():
+                    return archive_path
+            if cache_path.exists():
+                return cache_path
+            content = self._get_upstream(f"/th?id={image_id}")
+            if archive_path is not None:
+                stored = self._store_in_archive(archive_path, content, image_data, resolution)
+                if stored is not None:
+                    return stored
+            # アーカイブに登録できないもの（同じ画像の別市場・別解像度など）はミラー側に置く
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            write_file_atomic(cache_path, content)
+        return cache_path
+    
+    def _store_in_archive(self, path, content, image_data, resolution):
+        """取得ワーカーと同じ Bing のエントリとしてアーカイブに保存し、登録できなければ None。
+        インデックスに無いファイルはフォルダ監視が手動追加とみなすので、必ずエントリと一緒に書く"""
+        with self._archive_lock:
+            lock = FileLock(self.wallpaper_dir / FETCH_LOCK_NAME)
+            if not lock.acquire(blocking=False):
+                return None  # 取得中のワーカーとインデックスを取り合わない
+            try:
+                self.index.reload_if_changed()
+                key = image_identity(image_data)
+                if self.index.lookup(BingSource.name, key) is not None:
+                    return None  # 既に別の市場・解像度で保存済み
+                sha1 = hashlib.sha1(content).hexdigest()
+                existing = self.index.find_hash(sha1)
+                if existing is not None:
+                    return Path(existing)
+                write_file_atomic(path, content)
+                try:
+                    thumbnail = str(make_thumbnail(path, sha1))
+                except Exception as e:
+                    print(f"サムネイル作成失敗 {path}: {e}")
+                    thumbnail = None
+                stat = path.stat()
+                self.index.add({
+                    'source': BingSource.name, 'key': key, 'path': str(path),
+                    'sha1': sha1, 'thumbnail': thumbnail,
+                    'title': image_data.get('title', '不明'),
+                    'copyright': image_data.get('copyright', ''),
+                    'date': image_data['startdate'],
+                    'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                    'resolution': resolution,
                 })
+                self.index.save_changes()
+            finally:
+                lock.release()
+        return path
+
+
+class MirrorServer(ThreadingHTTPServer):
+    """WallpaperMirror をバックグラウンドスレッドで配信するHTTPサーバー"""
+    daemon_threads = True
+    
+    def __init__(self, mirror, host=MIRROR_DEFAULT_HOST, port=MIRROR_DEFAULT_PORT):
+        super().__init__((host, port), _MirrorHandler)
+        self.mirror = mirror
+        self._thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+def create_mirror_server(wallpaper_dir, settings):
+    """QSettings の mirror/host・mirror/port・mirror/upstream から生成"""
+    mirror = WallpaperMirror(
+        wallpaper_dir, upstream=settings.value("mirror/upstream", BING_BASE_URL))
+    return MirrorServer(mirror,
+                        host=settings.value("mirror/host", MIRROR_DEFAULT_HOST),
+                        port=int(settings.value("mirror/port", MIRROR_DEFAULT_PORT)))
+
+
+# ---------------------------------------------
+# キャプション（タイトル・著作権）の合成
+# ---------------------------------------------
+OVERLAY_POSITIONS = ["bottom-right", "bottom-left", "top-right", "top-left"]
+OVERLAY_CACHE_LIMIT = 32  # 保持する合成済み画像の最大数
+# 日本語グリフを含むフォントの候補（fc-match で見つからない場合に使用）
+OVERLAY_FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+
+
+def get_cache_dir():
+    """キャッシュの保存先（XDG_CACHE_HOME に従う）"""
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "BingWallpaper"
+
+
+@functools.lru_cache(maxsize=None)
+def _find_overlay_font(font_path=""):
+    """キャプション用フォントファイルを探す（見つからなければ None）"""
+    if font_path and Path(font_path).exists():
+        return font_path
+    try:
+        result = subprocess.run(["fc-match", "-f", "%{file}", "sans:lang=ja"],
+                                capture_output=True, text=True, timeout=5)
+        if result.returncode == 0 and Path(result.stdout.strip()).is_file():
+            return result.stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    for candidate in OVERLAY_FONT_CANDIDATES:
+        if Path(candidate).exists():
+            return candidate
+    return None
+
+
+class CaptionStyle:
+    """キャプションの表示位置と見た目。サイズは画面の高さに対する比率で指定する"""
+    
+    def __init__(self, position="bottom-right", font_size=0.022, color="#ffffff",
+                 background="#000000", background_opacity=0.55, margin=0.03, font_path=""):
+        self.position = position if position in OVERLAY_POSITIONS else "bottom-right"
+        self.font_size = font_size
+        self.color = color
+        self.background = background
+        self.background_opacity = background_opacity
+        self.margin = margin
+        self.font_path = font_path
+        
+    @classmethod
+    def from_settings(cls, settings):
+        """QSettings の overlay/* から生成"""
+        return cls(
+            position=settings.value("overlay/position", "bottom-right"),
+            font_size=float(settings.value("overlay/font_size", 0.022)),
+            color=settings.value("overlay/color", "#ffffff"),
+            background=settings.value("overlay/background", "#000000"),
+            background_opacity=float(settings.value("overlay/background_opacity", 0.55)),
+            margin=float(settings.value("overlay/margin", 0.03)),
+            font_path=settings.value("overlay/font", ""),
+        )
+        
+    def key(self):
+        return [self.position, self.font_size, self.color, self.background,
+                self.background_opacity, self.margin, self.font_path]
+
+
+class CaptionOverlayCache:
+    """合成済み画像のディスクキャッシュ。
+    キーは (元画像のハッシュ, 文字列, スタイル, 解像度) で、同じ組み合わせは再描画しない"""
+    
+    def __init__(self, cache_dir=None, limit=OVERLAY_CACHE_LIMIT):
+        self.cache_dir = Path(cache_dir or get_cache_dir() / "overlays")
+        self.limit = limit
+        self._hashes = {}  # (パス, サイズ, 更新時刻) → 画像ハッシュ
+        self._lock = threading.Lock()
+        
+    def image_hash(self, image_path):
+        """画像内容のハッシュ（同じファイルは stat が変わらない限り再計算しない）"""
+        stat = os.stat(image_path)
+        memo_key = (str(image_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(memo_key)
+        if cached:
+            return cached
+        digest = hashlib.sha1()
+        with open(image_path, 'rb') as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        with self._lock:
+            self._hashes[memo_key] = digest.hexdigest()
+        return digest.hexdigest()
+        
+    def cache_path(self, image_path, text, style, resolution):
+        key = json.dumps([self.image_hash(image_path), text, style.key(), list(resolution)],
+                         ensure_ascii=False)
+        return self.cache_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.jpg"
+        
+    def get(self, image_path, text, style, resolution):
+        """キャッシュ済みの合成画像を返し、無ければ描画して保存する"""
+        path = self.cache_path(image_path, text, style, resolution)
+        if path.exists():
+            os.utime(path)  # LRU用に最終利用時刻を更新
+            return path
+        with tracer.span("overlay.render", resolution=f"{resolution[0]}x{resolution[1]}"):
+            image = render_caption(image_path, text, style, resolution)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=92)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        write_file_atomic(path, buffer.getvalue())
+        self.prune()
+        return path
+        
+    def prune(self):
+        """古いものから削除して上限数に収める"""
+        entries = sorted(self.cache_dir.glob("*.jpg"), key=lambda p: p.stat().st_mtime)
+        for stale in entries[:-self.limit]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+
+def render_caption(image_path, text, style, resolution):
+    """画面サイズに合わせて画像を切り抜き、キャプションを描画した PIL 画像を返す"""
+    width, height = resolution
+    with Image.open(image_path) as source:
+        image = ImageOps.fit(source.convert("RGB"), (width, height), Image.Resampling.LANCZOS)
+    
+    font_size = max(10, int(height * style.font_size))
+    font_file = _find_overlay_font(style.font_path)
+    if font_file:
+        font = ImageFont.truetype(font_file, font_size)
+    else:
+        try:
+            font = ImageFont.load_default(size=font_size)
+        except TypeError:
+            # Pillow 10.1 未満は大きさを指定できない固定サイズのビットマップフォントのみ
+            font = ImageFont.load_default()
+    
+    overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    margin = int(height * style.margin)
+    padding = font_size // 2
+    left, top, right, bottom = draw.multiline_textbbox((0, 0), text, font=font, spacing=padding // 2)
+    box_width = right - left + padding * 2
+    box_height = bottom - top + padding * 2
+    
+    x = margin if style.position.endswith("left") else width - margin - box_width
+    y = margin if style.position.startswith("top") else height - margin - box_height
+    
+    alpha = int(255 * style.background_opacity)
+    draw.rounded_rectangle((x, y, x + box_width, y + box_height), radius=padding,
+                           fill=ImageColor.getrgb(style.background)[:3] + (alpha,))
+    align = "left" if style.position.endswith("left") else "right"
+    draw.multiline_text((x + padding - left, y + padding - top), text, font=font,
+                        fill=ImageColor.getrgb(style.color)[:3] + (255,), spacing=padding // 2, align=align)
+    return Image.alpha_composite(image.convert("RGBA"), overlay).convert("RGB")
+
+
+class OverlayRenderer(QThread):
+    """キャプション合成をGUIスレッドの外で行うワーカー（シグナルの先頭は元画像のパス）"""
+    finished = pyqtSignal(str, str)
+    error = pyqtSignal(str, str)
+    
+    def __init__(self, cache, image_path, text, style, resolution):
+        super().__init__()
+        self.cache = cache
+        self.image_path = image_path
+        self.text = text
+        self.style = style
+        self.resolution = resolution
+        
+    def run(self):
+        try:
+            path = self.cache.get(self.image_path, self.text, self.style, self.resolution)
+            self.finished.emit(str(self.image_path), str(path))
+        except Exception as e:
+            self.error.emit(str(self.image_path), str(e))
+
+
+# ---------------------------------------------
+# 画像キャッシュ（メモリ上限付き）と先読み
+# ---------------------------------------------
+PIXMAP_CACHE_BUDGET = 64 * 1024 * 1024  # サムネイル・プレビュー全体のメモリ上限（バイト）
+TILE_SIZE = (200, 110)
+PREVIEW_SIZE = (276, 156)
+
+
+def load_scaled_image(path, width, height):
+    """QImageReader で表示サイズに縮小しながらデコードする。
+    JPEGはデコード段階で縮小されるので、全体をデコードしてから縮小するより速い。
+    QImage はスレッドセーフなのでワーカースレッドからも呼べる"""
+    reader = QImageReader(str(path))
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid():
+        reader.setScaledSize(size.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+
+class PixmapCache:
+    """(パス, 幅, 高さ) をキーにした、バイト数上限付きのLRU pixmap キャッシュ。
+    QPixmap を扱うので GUI スレッドからのみ使う"""
+    
+    def __init__(self, budget=PIXMAP_CACHE_BUDGET):
+        self.budget = budget
+        # キャッシュの外（表示中のプレビュー）が参照し続ける分。budget から差し引いて、
+        # 追い出し済みでもウィジェットが持っている pixmap を含めた合計が budget を超えないようにする
+        self.reserved = 0
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        
+    @staticmethod
+    def cost(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+        
+    def __contains__(self, key):
+        return key in self._entries
+        
+    def get(self, key):
+        pixmap = self._entries.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return pixmap
+        
+    def insert(self, key, pixmap):
+        if key in self._entries:
+            self.used -= self.cost(self._entries.pop(key))
+        cost = self.cost(pixmap)
+        limit = max(0, self.budget - self.reserved)
+        if cost > limit:
+            return
+        self._entries[key] = pixmap
+        self.used += cost
+        # 上限を超えた分は使われていない順に捨てる
+        while self.used > limit:
+            _, evicted = self._entries.popitem(last=False)
+            self.used -= self.cost(evicted)
+        
+    def load(self, path, width, height):
+        """キャッシュから取得し、無ければその場でデコードして登録する（失敗時は None）"""
+        key = (str(path), width, height)
+        pixmap = self.get(key)
+        if pixmap is None:
+            image = load_scaled_image(path, width, height)
+            if image.isNull():
+                return None
+            pixmap = QPixmap.fromImage(image)
+            self.insert(key, pixmap)
+        return pixmap
+        
+    def invalidate(self, path):
+        """ファイルが変わった・消えたときに全サイズ分を捨てる"""
+        for key in [key for key in self._entries if key[0] == str(path)]:
+            self.used -= self.cost(self._entries.pop(key))
+        
+    def clear(self):
+        self._entries.clear()
+        self.used = 0
+
+
+# ギャラリーとプレビューで共有するキャッシュ
+pixmap_cache = PixmapCache()
+
+
+class _ImageLoadSignals(QObject):
+    loaded = pyqtSignal(str, int, int, QImage)
+
+
+class _ImageLoadTask(QRunnable):
+    """スレッドプール上で画像を縮小デコードするタスク"""
+    
+    def __init__(self, signals, path, width, height):
+        super().__init__()
+        self.signals = signals
+        self.path = path
+        self.width = width
+        self.height = height
+        
+    def run(self):
+        with tracer.span("prefetch.decode", path=self.path):
+            image = load_scaled_image(self.path, self.width, self.height)
+        self.signals.loaded.emit(self.path, self.width, self.height, image)
+
+
+class PreviewPrefetcher(QObject):
+    """タイルにマウスが乗った時点でプレビューサイズの画像を裏で用意しておく"""
+    
+    def __init__(self, cache, size=PREVIEW_SIZE, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.size = size
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.signals = _ImageLoadSignals(self)
+        self.signals.loaded.connect(self._on_loaded)
+        self._pending = set()
+        
+    def prefetch(self, path):
+        key = (str(path), *self.size)
+        if key in self.cache or key in self._pending:
+            return
+        self._pending.add(key)
+        self.pool.start(_ImageLoadTask(self.signals, str(path), *self.size))
+        
+    def _on_loaded(self, path, width, height, image):
+        key = (path, width, height)
+        self._pending.discard(key)
+        if not image.isNull():
+            self.cache.insert(key, QPixmap.fromImage(image))
+
+
+# ---------------------------------------------
+# 壁紙フォルダの監視（差分同期）
+# ---------------------------------------------
+# フォルダ外から追加・削除・名前変更・上書きされたファイルだけを
+# インデックス・サムネイル・ギャラリーに反映し、フォルダ全体の再走査を避ける
+ARCHIVE_DEBOUNCE_MS = 300  # 連続した変更をまとめる待ち時間
+ARCHIVE_MAX_DELAY = 2.0  # 変更が続いてもこの秒数ごとには反映する
+
+# <sys/inotify.h> のイベント種別
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def is_archive_file(name):
+    """監視対象の画像か（.part や .index.json などの隠しファイルは除く）"""
+    return not name.startswith(".") and Path(name).suffix.lower() in IMAGE_EXTENSIONS
+
+
+class InotifyWatcher(QObject):
+    """inotify でフォルダ直下の変更されたファイル名を受け取る（Linux専用、ctypes経由）"""
+    changed = pyqtSignal(list)
+    overflowed = pyqtSignal()
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+    
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            inotify_init1 = libc.inotify_init1
+            inotify_add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError("inotify を利用できません")
+        self.fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify の初期化に失敗しました")
+        if inotify_add_watch(self.fd, os.fsencode(str(directory)), self.MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"フォルダを監視できません: {directory}")
+        # Qt のイベントループで読めるようになったら通知を受ける
+        self.notifier = QSocketNotifier(self.fd, QSocketNotifier.Type.Read, self)
+        self.notifier.activated.connect(self.read_events)
+        
+    def read_events(self):
+        names = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed.emit()
+                elif name:
+                    names.append(os.fsdecode(name))
+        if names:
+            self.changed.emit(names)
+            
+    def close(self):
+        self.notifier.setEnabled(False)
+        os.close(self.fd)
+
+
+class ArchiveSync(QObject):
+    """壁紙フォルダを監視し、変更のあったファイルだけインデックス・サムネイルを更新して
+    synced で通知する。inotify が使えない環境では QFileSystemWatcher と一覧の比較で代替する"""
+    synced = pyqtSignal(dict)  # {'added': [壁紙], 'modified': [壁紙], 'removed': [パス], 'moved': [(旧パス, 壁紙)]}
+    
+    def __init__(self, wallpaper_dir, debounce_ms=ARCHIVE_DEBOUNCE_MS, use_inotify=True,
+                 parent=None):
+        super().__init__(parent)
+        self.wallpaper_dir = Path(wallpaper_dir)
+        self.index = WallpaperIndex(self.wallpaper_dir)
+        self.snapshot = self.scan()  # ファイル名 -> (サイズ, 更新時刻)
+        self.pending = set()
+        self.needs_scan = False
+        self._batch_started = 0.0
+        
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.flush)
+        
+        self.watcher = None
+        if use_inotify:
+            try:
+                self.watcher = InotifyWatcher(self.wallpaper_dir, self)
+                self.watcher.changed.connect(self.on_changed)
+                self.watcher.overflowed.connect(self.on_directory_changed)
+                self.backend = "inotify"
+            except OSError as e:
+                print(f"inotify を使わずに監視します: {e}")
+        if self.watcher is None:
+            # 変更されたファイル名は分からないので、反映時に一覧を比較する
+            self.watcher = QFileSystemWatcher([str(self.wallpaper_dir)], self)
+            self.watcher.directoryChanged.connect(self.on_directory_changed)
+            self.backend = "qfilesystemwatcher"
+            
+    def scan(self):
+        snapshot = {}
+        with os.scandir(self.wallpaper_dir) as entries:
+            for entry in entries:
+                if is_archive_file(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+        
+    def on_changed(self, names):
+        self.pending.update(name for name in names if is_archive_file(name))
+        if self.pending:
+            self.schedule()
+            
+    def on_directory_changed(self, *args):
+        self.needs_scan = True
+        self.schedule()
+        
+    def schedule(self):
+        # 変更が来るたびに待ち直すが、一括コピーなどで延々と遅れないよう上限を設ける
+        now = time.monotonic()
+        if not self.timer.isActive():
+            self._batch_started = now
+            self.timer.start()
+        elif now - self._batch_started < ARCHIVE_MAX_DELAY:
+            self.timer.start()
             
-            self.finished.emit({'wallpapers': wallpapers})
+    def flush(self):
+        # 取得中のワーカーとインデックスを取り合わないよう、取得が終わるまで待つ
+        lock = FileLock(self.wallpaper_dir / FETCH_LOCK_NAME)
+        if not lock.acquire(blocking=False):
+            self.timer.start()
+            return
+        try:
+            with tracer.span("archive.sync", files=len(self.pending), scan=self.needs_scan):
+                if self.needs_scan:
+                    changes = self.rescan()
+                else:
+                    changes = self.apply(self.pending)
+        finally:
+            lock.release()
+            self.pending.clear()
+            self.needs_scan = False
+        if any(changes.values()):
+            self.synced.emit(changes)
             
+    def apply(self, names):
+        """通知されたファイルだけを調べて反映する"""
+        self.index.reload_if_changed()
+        current = {}
+        for name in names:
+            try:
+                stat = os.stat(self.wallpaper_dir / name)
+            except FileNotFoundError:
+                continue
+            current[name] = (stat.st_size, stat.st_mtime_ns)
+        before = {name: self.snapshot[name] for name in names if name in self.snapshot}
+        return self.reconcile(before, current)
+        
+    def rescan(self):
+        """フォルダ全体を走査してインデックスと突き合わせる（取りこぼし時の回復用）"""
+        self.index.reload_if_changed()
+        current = self.scan()
+        before = dict(self.snapshot)
+        for name, signature in current.items():
+            entries = self.index.entries_for_path(self.wallpaper_dir / name)
+            if not entries:
+                # インデックスに無いファイルは新規として取り込む
+                before.pop(name, None)
+            elif entries[0].get('mtime_ns') is None:
+                # 記録の無い古いエントリは内容ハッシュを信頼してサイズと時刻だけ記録する
+                for entry in entries:
+                    entry['size'], entry['mtime_ns'] = signature
+                before[name] = signature
+            elif (entries[0]['size'], entries[0]['mtime_ns']) != signature:
+                before[name] = (entries[0]['size'], entries[0]['mtime_ns'])
+        # 留守中に消えたファイルのエントリ
+        for entry in list(self.index.entries.values()):
+            path = Path(entry['path'])
+            if path.parent == self.wallpaper_dir and path.name not in current:
+                before.setdefault(path.name, (entry.get('size'), entry.get('mtime_ns')))
+        return self.reconcile(before, current, self.snapshot.keys() | current.keys() | before.keys())
+        
+    def reconcile(self, before, current, names=None):
+        changes = {'added': [], 'modified': [], 'removed': [], 'moved': []}
+        removed = {name: signature for name, signature in before.items() if name not in current}
+        added = {name: signature for name, signature in current.items() if name not in before}
+        modified = [name for name, signature in current.items()
+                    if name in before and before[name] != signature]
+        
+        # 消えたファイルと同じサイズ・更新時刻のファイルが現れたら名前変更とみなす
+        renamed_from = {signature: name for name, signature in removed.items()}
+        for name, signature in list(added.items()):
+            old_name = renamed_from.pop(signature, None)
+            if old_name is not None:
+                del added[name]
+                del removed[old_name]
+                changes['moved'].append((str(self.wallpaper_dir / old_name),
+                                         self.move(old_name, name, signature)))
+        for name in removed:
+            changes['removed'].append(self.remove(name))
+        for name in modified:
+            changes['modified'].append(self.update(name, current[name]))
+        for name in added:
+            changes['added'].append(self.update(name, current[name]))
+        
+        for name in (before.keys() | current.keys()) if names is None else names:
+            if name in current:
+                self.snapshot[name] = current[name]
+            else:
+                self.snapshot.pop(name, None)
+        if names is not None:
+            self.index.save()
+        elif any(changes.values()):
+            self.index.save_changes()
+        return changes
+        
+    def update(self, name, signature):
+        """追加・上書きされたファイルのハッシュとサムネイルを作り直す"""
+        path = self.wallpaper_dir / name
+        entries = self.index.entries_for_path(path)
+        if entries and (entries[0].get('size'), entries[0].get('mtime_ns')) == signature:
+            # 取得ワーカーが書いたファイルなど、既に登録済み
+            return self.wallpaper(entries[0])
+        
+        sha1 = file_sha1(path)
+        try:
+            thumbnail = str(make_thumbnail(path, sha1))
         except Exception as e:
-            self.error.emit(str(e))
+            print(f"サムネイル作成失敗 {path}: {e}")
+            thumbnail = None
+        if not entries:
+            date = re.search(r"(\d{8})", name)
+            entries = [{
+                'source': ARCHIVE_SOURCE, 'key': name, 'path': str(path),
+                'title': path.stem, 'copyright': '',
+                'date': date.group(1) if date else datetime.fromtimestamp(
+                    signature[1] / 1e9).strftime("%Y%m%d"),
+            }]
+        for entry in entries:
+            old_sha1 = entry.get('sha1')
+            entry.update(sha1=sha1, thumbnail=thumbnail, size=signature[0], mtime_ns=signature[1])
+            self.index.add(entry)
+            if old_sha1 and old_sha1 != sha1 and self.index.release_hash(old_sha1, path):
+                remove_thumbnail(old_sha1)
+        return self.wallpaper(entries[0])
+        
+    def remove(self, name):
+        path = self.wallpaper_dir / name
+        for sha1 in self.index.remove_path(path):
+            remove_thumbnail(sha1)
+        return str(path)
+        
+    def move(self, old_name, name, signature):
+        moved = self.index.move_path(self.wallpaper_dir / old_name, self.wallpaper_dir / name)
+        if not moved:
+            return self.update(name, signature)
+        for entry in moved:
+            if entry['source'] == ARCHIVE_SOURCE:
+                entry['title'] = Path(name).stem
+        return self.wallpaper(moved[0])
+        
+    @staticmethod
+    def wallpaper(entry):
+        """インデックスのエントリをギャラリー用の壁紙情報にする"""
+        return {
+            'path': entry['path'],
+            'title': entry.get('title', Path(entry['path']).stem),
+            'copyright': entry.get('copyright', ''),
+            'date': entry.get('date', ''),
+            'url': Path(entry['path']).as_uri(),
+            'source': entry['source'],
+            'thumbnail': entry.get('thumbnail'),
+        }
+        
+    def close(self):
+        self.timer.stop()
+        if isinstance(self.watcher, InotifyWatcher):
+            self.watcher.close()
+
+
+GALLERY_COLUMNS = 4  # 4列で8枚を2行に配置
+
+
+class TileImageLabel(QLabel):
+    """タイルの画像部分。pixmap を自分では持たず、描画のたびに共有キャッシュから取り出す
+    （追い出されていれば読み直す）ので、タイルが何枚あってもキャッシュの上限を超えない。
+    画面外のタイルは描画されないため読み込みも起きない"""
+    
+    def __init__(self, wallpaper_info):
+        super().__init__()
+        self.wallpaper_info = wallpaper_info
+        self.failed = False
+        
+    def reload(self):
+        """ファイルが変わったときに読み込み失敗の状態を戻して描き直す"""
+        self.failed = False
+        self.clear()
+        self.update()
+        
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.failed:
+            return
+        # 取得時に作ったサムネイルがあれば元画像をデコードしない
+        path = self.wallpaper_info.get('thumbnail') or self.wallpaper_info['path']
+        key = (str(path), *TILE_SIZE)
+        if key in pixmap_cache:
+            pixmap = pixmap_cache.get(key)
+        else:
+            try:
+                # アスペクト比を保持して縮小デコード（共有キャッシュ経由）
+                with tracer.span("widget.decode", path=self.wallpaper_info['path']):
+                    pixmap = pixmap_cache.load(path, *TILE_SIZE)
+            except Exception:
+                pixmap = None
+            if pixmap is None:
+                self.failed = True
+                self.setText("プレビュー\n読み込み失敗")
+                return
+        painter = QPainter(self)
+        painter.drawPixmap((self.width() - pixmap.width()) // 2,
+                           (self.height() - pixmap.height()) // 2, pixmap)
+        painter.end()
+
 
 class WallpaperWidget(QWidget):
     """壁紙プレビューウィジェット"""
     clicked = pyqtSignal(str)
+    hovered = pyqtSignal(str)
     
     def __init__(self, wallpaper_info):
         super().__init__()
@@ -218,7 +2483,7 @@ class WallpaperWidget(QWidget):
         layout.setContentsMargins(5, 5, 5, 5)
         
         # 画像プレビュー
-        self.image_label = QLabel()
+        self.image_label = TileImageLabel(self.wallpaper_info)
         self.image_label.setFixedSize(200, 110)  # 4列に収まるようサイズ調整
         self.image_label.setStyleSheet("""
             QLabel {
@@ -234,9 +2499,6 @@ class WallpaperWidget(QWidget):
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.image_label.mousePressEvent = self.on_click
         
-        # 壁紙を読み込み
-        self.load_image()
-        
         # タイトル
         title_label = QLabel(self.wallpaper_info['title'][:30] + "...")
         title_label.setFont(QFont("Arial", 9, QFont.Weight.Bold))
@@ -244,8 +2506,12 @@ class WallpaperWidget(QWidget):
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         title_label.setFixedSize(200, 30)  # 画像プレビューと同じ幅、高さ30px
         
-        # 日付
-        date_label = QLabel(self.wallpaper_info['date'])
+        # 日付（Bing以外はソース名も表示）
+        date_text = self.wallpaper_info['date']
+        source = self.wallpaper_info.get('source', BingSource.name)
+        if source != BingSource.name:
+            date_text = f"{date_text} · {SOURCE_LABELS.get(source, source)}"
+        date_label = QLabel(date_text)
         date_label.setFont(QFont("Arial", 8))
         date_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         date_label.setStyleSheet("color: #666;")
@@ -258,40 +2524,59 @@ class WallpaperWidget(QWidget):
         self.setLayout(layout)
         
     def load_image(self):
-        """画像を読み込んでプレビュー表示"""
-        try:
-            pixmap = QPixmap(self.wallpaper_info['path'])
-            if not pixmap.isNull():
-                # アスペクト比を保持してリサイズ
-                scaled_pixmap = pixmap.scaled(
-                    200, 110, 
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.image_label.setPixmap(scaled_pixmap)
-            else:
-                self.image_label.setText("プレビュー\n読み込み失敗")
-        except Exception as e:
-            self.image_label.setText("プレビュー\nエラー")
+        """画像を読み込み直してプレビュー表示（描画時に共有キャッシュから読み込む）"""
+        self.image_label.reload()
             
     def on_click(self, event):
         """クリック時の処理"""
         self.clicked.emit(self.wallpaper_info['path'])
+        
+    def enterEvent(self, event):
+        """マウスが乗ったらプレビューの先読みを依頼"""
+        self.hovered.emit(self.wallpaper_info['path'])
+        super().enterEvent(event)
 
 class BingWallpaperApp(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.wallpaper_dir = Path.home() / "Pictures" / "BingWallpapers"
+        self.wallpaper_dir = get_wallpaper_dir()
         self.wallpaper_dir.mkdir(parents=True, exist_ok=True)
         
         self.wallpapers = []
+        self.gallery_tiles = {}  # パス -> WallpaperWidget
         self.current_wallpaper = None
+        self.fetcher = None
+        self.backfill_crawler = None
+        self.backfill_count = 0
+        self.mirror_server = None
+        self.overlay_cache = CaptionOverlayCache()
+        self.preview_prefetcher = PreviewPrefetcher(pixmap_cache, parent=self)
+        self.overlay_renderer = None
+        self.gallery_reset_pending = False
+        
+        # 失敗した壁紙のバックグラウンド再試行
+        self.retry_fetcher = None
+        self.retry_round = 0
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.retry_failed_wallpapers)
+        self.pending_retry_images = []
         
         # ウィンドウアイコンを設定
         self.setWindowIcon(get_app_icon(64))
         
         # 設定
         self.settings = QSettings("BingWallpaper", "Settings")
+        pixmap_cache.budget = int(self.settings.value("memory/pixmap_cache_mb", 64)) * 1024 * 1024
+        # タイルは pixmap を持たないので、プレビューが持ち続ける分だけ予約しておく
+        pixmap_cache.reserved = PREVIEW_SIZE[0] * PREVIEW_SIZE[1] * 4
+        
+        # 壁紙フォルダの外部での変更をギャラリーに反映
+        self.archive_sync = ArchiveSync(
+            self.wallpaper_dir,
+            debounce_ms=int(self.settings.value("archive/debounce_ms", ARCHIVE_DEBOUNCE_MS)),
+            parent=self)
+        self.archive_sync.synced.connect(self.on_archive_synced)
         
         self.setup_ui()
         self.setup_style()
@@ -300,6 +2585,10 @@ class BingWallpaperApp(QMainWindow):
         # 自動更新タイマーを初期化（標準でオン）
         self.setup_auto_update()
         
+        # LANミラー（設定で有効な場合のみ）
+        if self.settings.value("mirror/enabled", False, type=bool):
+            self.start_mirror()
+        
         # 起動時に壁紙を取得
         QTimer.singleShot(1000, self.fetch_wallpapers)
         
@@ -377,6 +2666,9 @@ class BingWallpaperApp(QMainWindow):
         self.set_btn.clicked.connect(self.set_wallpaper)
         self.set_btn.setEnabled(False)
         
+        self.backfill_btn = QPushButton("🕰️ 過去の壁紙を取得")
+        self.backfill_btn.clicked.connect(self.toggle_backfill)
+        
         self.folder_btn = QPushButton("📁 フォルダを開く")
         self.folder_btn.clicked.connect(self.open_folder)
         
@@ -386,6 +2678,7 @@ class BingWallpaperApp(QMainWindow):
         
         button_layout.addWidget(self.fetch_btn)
         button_layout.addWidget(self.set_btn)
+        button_layout.addWidget(self.backfill_btn)
         button_layout.addWidget(self.folder_btn)
         button_layout.addWidget(self.auto_checkbox)
         button_group.setLayout(button_layout)
@@ -397,8 +2690,13 @@ class BingWallpaperApp(QMainWindow):
         self.desktop_combo = QComboBox()
         self.desktop_combo.addItems(["自動検出", "GNOME", "KDE", "XFCE", "その他 (feh)"])
         
+        self.overlay_checkbox = QCheckBox("タイトルと著作権を表示")
+        self.overlay_checkbox.setChecked(self.settings.value("overlay/enabled", False, type=bool))
+        self.overlay_checkbox.toggled.connect(self.toggle_overlay)
+        
         desktop_layout.addWidget(QLabel("デスクトップ環境:"))
         desktop_layout.addWidget(self.desktop_combo)
+        desktop_layout.addWidget(self.overlay_checkbox)
         desktop_group.setLayout(desktop_layout)
         
         # プログレスバー
@@ -646,9 +2944,35 @@ class BingWallpaperApp(QMainWindow):
     def setup_auto_update(self):
         """自動更新の初期設定"""
         self.auto_timer = QTimer()
-        self.auto_timer.timeout.connect(self.fetch_wallpapers)
+        self.auto_timer.timeout.connect(self.auto_fetch_wallpapers)
         self.auto_timer.start(24 * 60 * 60 * 1000)  # 24時間
         
+    def start_mirror(self):
+        """ダウンロード済みの壁紙をLAN内の他の端末へ配信する"""
+        if self.mirror_server is not None:
+            return
+        try:
+            self.mirror_server = create_mirror_server(self.wallpaper_dir, self.settings).start()
+        except OSError as e:
+            self.status_label.setText(f"❌ ミラーを開始できません: {e}")
+            return
+        QApplication.instance().aboutToQuit.connect(self.mirror_server.stop)
+        self.status_label.setText(f"🌐 ミラーを公開中: {self.mirror_server.base_url}")
+        
+    def handle_command(self, command):
+        """別プロセスから転送されたコマンドを処理"""
+        if command == "fetch":
+            self.fetch_wallpapers()
+        elif command == "backfill":
+            if self.backfill_crawler is None or not self.backfill_crawler.isRunning():
+                self.toggle_backfill()
+        elif command == "show":
+            self.show()
+            self.raise_()
+            self.activateWindow()
+        else:
+            print(f"不明なコマンド: {command}")
+        
     def tray_icon_activated(self, reason):
         """トレイアイコンクリック時の処理"""
         if reason == QSystemTrayIcon.ActivationReason.Trigger:
@@ -659,41 +2983,169 @@ class BingWallpaperApp(QMainWindow):
                 self.raise_()
                 self.activateWindow()
         
+    def auto_fetch_wallpapers(self):
+        """自動更新タイマーからの取得（従量制回線では設定に従って見送る）"""
+        allow_metered = self.settings.value("network/metered_auto_update", False, type=bool)
+        # network/metered=always|never の指定を検出結果より優先する
+        if not allow_metered and FetchPolicy.from_settings(self.settings).metered:
+            self.status_label.setText("従量制回線のため自動更新を見送りました")
+            return
+        self.fetch_wallpapers()
+        
     def fetch_wallpapers(self):
         """壁紙を更新して取得"""
+        if self.fetcher is not None and self.fetcher.isRunning():
+            return
+        
         self.fetch_btn.setEnabled(False)
         self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)
         self.status_label.setText("壁紙を取得中...")
         
-        # 既存の壁紙をクリア
-        self.clear_gallery()
+        # 既存の壁紙は最初の1枚が届いた時点でクリア（失敗時は残す）
+        self.gallery_reset_pending = True
+        self.retry_timer.stop()
+        self.pending_retry_images = []
+        self.retry_round = 0
+        if self.retry_fetcher is not None and self.retry_fetcher.isRunning():
+            # 古い再試行の結果は新しい取得の状態を乱さないよう全て捨てる
+            self.retry_fetcher.wallpaper_ready.disconnect(self.on_wallpaper_ready)
+            self.retry_fetcher.finished.disconnect(self.on_retry_finished)
+            self.retry_fetcher.error.disconnect(self.on_fetch_error)
         
         # ワーカースレッドで取得
-        self.fetcher = WallpaperFetcher(self.wallpaper_dir)
+        self.fetcher = create_fetcher(self.wallpaper_dir, self.settings)
+        self.fetcher.wallpaper_ready.connect(self.on_wallpaper_ready)
         self.fetcher.finished.connect(self.on_wallpapers_fetched)
         self.fetcher.error.connect(self.on_fetch_error)
         self.fetcher.progress.connect(self.on_fetch_progress)
         self.fetcher.start()
         
+    def on_wallpaper_ready(self, wallpaper):
+        """1枚取得するごとにギャラリーへ追加"""
+        if self.gallery_reset_pending:
+            self.clear_gallery()
+            self.wallpapers = []
+            self.gallery_reset_pending = False
+        if any(w['path'] == wallpaper['path'] for w in self.wallpapers):
+            return
+        self.wallpapers.append(wallpaper)
+        self.add_gallery_tile(wallpaper)
+        
     def on_wallpapers_fetched(self, result):
         """壁紙取得完了時の処理"""
-        self.wallpapers = result['wallpapers']
-        self.populate_gallery()
-        
+        self.gallery_reset_pending = False
         self.fetch_btn.setEnabled(True)
         self.progress_bar.setVisible(False)
-        self.status_label.setText(f"✅ {len(self.wallpapers)}枚の壁紙を取得しました")
+        
+        failed = result.get('failed', [])
+        if failed:
+            self.status_label.setText(
+                f"⚠️ {len(result['wallpapers'])}枚を取得、{len(failed)}枚は後で再試行します")
+            self.schedule_retry(failed)
+        else:
+            self.status_label.setText(f"✅ {len(result['wallpapers'])}枚の壁紙を取得しました")
+        
+        # ソースごとの取得枚数とスループットをツールチップに出す
+        lines = []
+        for name, metrics in result.get('metrics', {}).items():
+            lines.append(f"{SOURCE_LABELS.get(name, name)}: {metrics['images']}枚"
+                         f" / 失敗 {metrics['failed']}枚"
+                         f" / {metrics['bytes_per_second'] / 1024:.0f} KB/s")
+        self.status_label.setToolTip("\n".join(lines))
         
     def on_fetch_error(self, error_msg):
-        """壁紙取得エラー時の処理"""
+        """壁紙取得エラー時の処理（ダイアログは出さず、表示中のギャラリーは残す）"""
+        self.gallery_reset_pending = False
         self.fetch_btn.setEnabled(True)
         self.progress_bar.setVisible(False)
         self.status_label.setText(f"❌ エラー: {error_msg}")
+        self.notify("壁紙の取得に失敗しました", error_msg, QSystemTrayIcon.MessageIcon.Warning)
         
-        QMessageBox.critical(self, "エラー", f"壁紙の取得に失敗しました:\n{error_msg}")
+    def schedule_retry(self, images):
+        """取得に失敗した壁紙をバックグラウンドで再試行する"""
+        if self.retry_round >= len(BACKGROUND_RETRY_DELAYS):
+            self.notify("壁紙の取得に失敗しました",
+                        f"{len(images)}枚の壁紙を取得できませんでした",
+                        QSystemTrayIcon.MessageIcon.Warning)
+            return
+        self.pending_retry_images = images
+        self.retry_timer.start(BACKGROUND_RETRY_DELAYS[self.retry_round] * 1000)
+        self.retry_round += 1
+        
+    def retry_failed_wallpapers(self):
+        """保留中の壁紙だけを取得し直す"""
+        if not self.pending_retry_images:
+            return
+        if self.fetcher is not None and self.fetcher.isRunning():
+            return
+        if self.retry_fetcher is not None and self.retry_fetcher.isRunning():
+            # 前回の再試行がまだ動いている間は参照を差し替えず、少し待ってからやり直す
+            self.retry_timer.start(BACKGROUND_RETRY_DELAYS[0] * 1000)
+            return
+        self.retry_fetcher = create_fetcher(self.wallpaper_dir, self.settings,
+                                            images=self.pending_retry_images)
+        self.pending_retry_images = []
+        self.retry_fetcher.wallpaper_ready.connect(self.on_wallpaper_ready)
+        self.retry_fetcher.finished.connect(self.on_retry_finished)
+        self.retry_fetcher.error.connect(self.on_fetch_error)
+        self.retry_fetcher.start()
+        
+    def on_retry_finished(self, result):
+        """バックグラウンド再試行の完了"""
+        failed = result.get('failed', [])
+        if result['wallpapers']:
+            self.status_label.setText(f"✅ {len(result['wallpapers'])}枚の壁紙を再取得しました")
+        if failed:
+            self.schedule_retry(failed)
+        
+    def toggle_backfill(self):
+        """過去の壁紙のバックフィルを開始／停止"""
+        if self.backfill_crawler is not None and self.backfill_crawler.isRunning():
+            self.backfill_crawler.stop()
+            self.backfill_btn.setEnabled(False)
+            self.status_label.setText("バックフィルを停止しています...")
+            return
         
-    def on_fetch_progress(self, message):
-        """進捗更新"""
+        # 過去の壁紙はギャラリー（最新分）には並べず、枚数だけ表示する
+        self.backfill_count = 0
+        self.backfill_crawler = create_backfill_crawler(self.wallpaper_dir, self.settings)
+        self.backfill_crawler.wallpaper_ready.connect(self.on_backfill_wallpaper)
+        self.backfill_crawler.progress.connect(self.on_backfill_progress)
+        self.backfill_crawler.finished.connect(self.on_backfill_finished)
+        self.backfill_crawler.error.connect(self.on_backfill_error)
+        self.backfill_crawler.start(QThread.Priority.LowestPriority)
+        self.backfill_btn.setText("⏹️ 過去の壁紙の取得を停止")
+        
+    def on_backfill_wallpaper(self, wallpaper):
+        self.backfill_count += 1
+        
+    def on_backfill_progress(self, message, estimated_bytes, transferred_bytes):
+        """通常の取得中はそちらの進捗表示を優先する"""
+        if self.fetcher is None or not self.fetcher.isRunning():
+            self.status_label.setText(f"{message} - {self.backfill_count}枚取得済み")
+        
+    def on_backfill_finished(self, result):
+        self.backfill_btn.setText("🕰️ 過去の壁紙を取得")
+        self.backfill_btn.setEnabled(True)
+        self.status_label.setText(f"🕰️ 過去の壁紙を{len(result['wallpapers'])}枚取得しました")
+        
+    def on_backfill_error(self, error_msg):
+        self.backfill_btn.setText("🕰️ 過去の壁紙を取得")
+        self.backfill_btn.setEnabled(True)
+        self.status_label.setText(f"❌ バックフィル中断: {error_msg}（次回は続きから再開）")
+        
+    def notify(self, title, message, icon=QSystemTrayIcon.MessageIcon.Information):
+        """トレイ通知（トレイが無い環境ではステータス表示のみ）"""
+        if hasattr(self, 'tray_icon'):
+            self.tray_icon.showMessage(title, message, icon, 3000)
+        
+    def on_fetch_progress(self, message, estimated_bytes, transferred_bytes):
+        """進捗更新（見込み/転送済みバイト数をプログレスバーに反映）"""
+        if estimated_bytes > 0:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(min(1000, transferred_bytes * 1000 // estimated_bytes))
+            message += f" ({transferred_bytes / 1_000_000:.1f}/{estimated_bytes / 1_000_000:.1f} MB)"
         self.status_label.setText(message)
         
     def clear_gallery(self):
@@ -702,22 +3154,83 @@ class BingWallpaperApp(QMainWindow):
             child = self.gallery_layout.takeAt(0)
             if child.widget():
                 child.widget().deleteLater()
+        self.gallery_tiles = {}
                 
     def populate_gallery(self):
         """ギャラリーに壁紙を表示（8枚を4x2配置）"""
-        row, col = 0, 0
-        max_cols = 4  # 4列で8枚を2行に配置
+        with tracer.span("gallery.populate", count=len(self.wallpapers)):
+            for wallpaper in self.wallpapers:
+                self.add_gallery_tile(wallpaper)
+                
+    def add_gallery_tile(self, wallpaper):
+        """ギャラリーの末尾に壁紙を1枚追加"""
+        row, col = divmod(self.gallery_layout.count(), GALLERY_COLUMNS)
         
-        for wallpaper in self.wallpapers:
-            widget = WallpaperWidget(wallpaper)
-            widget.clicked.connect(self.on_wallpaper_selected)
-            
+        widget = WallpaperWidget(wallpaper)
+        widget.clicked.connect(self.on_wallpaper_selected)
+        widget.hovered.connect(self.preview_prefetcher.prefetch)
+        self.gallery_layout.addWidget(widget, row, col)
+        self.gallery_tiles[wallpaper['path']] = widget
+        
+    def relayout_gallery(self):
+        """タイルを作り直さずに並び順だけ詰め直す"""
+        widgets = [self.gallery_tiles[w['path']] for w in self.wallpapers
+                   if w['path'] in self.gallery_tiles]
+        for widget in widgets:
+            self.gallery_layout.removeWidget(widget)
+        for i, widget in enumerate(widgets):
+            row, col = divmod(i, GALLERY_COLUMNS)
             self.gallery_layout.addWidget(widget, row, col)
             
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
+    def on_archive_synced(self, changes):
+        """フォルダの変更を、影響のあった壁紙のタイルだけに反映"""
+        with tracer.span("gallery.sync"):
+            for path in changes['removed']:
+                pixmap_cache.invalidate(path)
+                self.wallpapers = [w for w in self.wallpapers if w['path'] != path]
+                widget = self.gallery_tiles.pop(path, None)
+                if widget is not None:
+                    self.gallery_layout.removeWidget(widget)
+                    widget.deleteLater()
+                if self.current_wallpaper == path:
+                    self.current_wallpaper = None
+                    self.set_btn.setEnabled(False)
+                    self.current_preview.clear()
+                    self.current_preview.setText("壁紙を選択してください")
+                    self.current_title.setText("タイトル: 未選択")
+            
+            for old_path, wallpaper in changes['moved']:
+                pixmap_cache.invalidate(old_path)
+                # タイルは同じ辞書を参照しているので書き換えるだけでよい
+                for info in self.wallpapers:
+                    if info['path'] == old_path:
+                        info['path'] = wallpaper['path']
+                widget = self.gallery_tiles.pop(old_path, None)
+                if widget is not None:
+                    self.gallery_tiles[wallpaper['path']] = widget
+                if self.current_wallpaper == old_path:
+                    self.current_wallpaper = wallpaper['path']
+            
+            for wallpaper in changes['modified']:
+                pixmap_cache.invalidate(wallpaper['path'])
+                for info in self.wallpapers:
+                    if info['path'] == wallpaper['path']:
+                        info['thumbnail'] = wallpaper['thumbnail']
+                widget = self.gallery_tiles.get(wallpaper['path'])
+                if widget is not None:
+                    widget.load_image()
+            
+            for wallpaper in changes['added']:
+                # 取得処理が書いたファイル（最新分は wallpaper_ready で表示済み、
+                # バックフィル分はギャラリーに出さない）は除き、外から置かれた画像だけ追加
+                if wallpaper['source'] != ARCHIVE_SOURCE:
+                    continue
+                if wallpaper['path'] not in self.gallery_tiles:
+                    self.wallpapers.append(wallpaper)
+                    self.add_gallery_tile(wallpaper)
+            
+            if changes['removed']:
+                self.relayout_gallery()
                 
     def on_wallpaper_selected(self, wallpaper_path):
         """壁紙選択時の処理"""
@@ -731,30 +3244,67 @@ class BingWallpaperApp(QMainWindow):
                 break
                 
         if selected_info:
-            # プレビューを更新
-            pixmap = QPixmap(wallpaper_path)
-            if not pixmap.isNull():
-                scaled_pixmap = pixmap.scaled(
-                    276, 156,
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.current_preview.setPixmap(scaled_pixmap)
+            # プレビューを更新（ホバー時に先読み済みならキャッシュから即表示）
+            with tracer.span("preview.load", path=wallpaper_path):
+                pixmap = pixmap_cache.load(wallpaper_path, *PREVIEW_SIZE)
+            if pixmap is not None:
+                self.current_preview.setPixmap(pixmap)
                 
             # タイトルを更新
             self.current_title.setText(f"タイトル: {selected_info['title']}")
             
-            # 設定ボタンを有効化
-            self.set_btn.setEnabled(True)
+            # 設定ボタンを有効化（合成中は結果が前後しないよう、終わるまで無効のまま）
+            self.set_btn.setEnabled(not self.is_overlay_rendering())
             
             self.status_label.setText(f"壁紙を選択: {selected_info['title'][:30]}...")
             
     def set_wallpaper(self):
-        """デスクトップ壁紙を設定"""
+        """デスクトップ壁紙を設定（キャプション表示が有効なら合成後の画像を使う）"""
         if not self.current_wallpaper:
             QMessageBox.warning(self, "警告", "設定する壁紙を選択してください")
             return
-            
+        if self.is_overlay_rendering():
+            return
+        
+        if not self.overlay_checkbox.isChecked():
+            self.apply_wallpaper(self.current_wallpaper)
+            return
+        
+        info = next((w for w in self.wallpapers if w['path'] == self.current_wallpaper), None)
+        if info is None:
+            self.apply_wallpaper(self.current_wallpaper)
+            return
+        text = "\n".join(part for part in (info['title'], info['copyright']) if part)
+        style = CaptionStyle.from_settings(self.settings)
+        screen = QApplication.primaryScreen()
+        size = screen.size() * screen.devicePixelRatio() if screen else QSize(1920, 1080)
+        
+        self.set_btn.setEnabled(False)
+        self.status_label.setText("キャプションを合成中...")
+        self.overlay_renderer = OverlayRenderer(self.overlay_cache, self.current_wallpaper, text,
+                                                style, (size.width(), size.height()))
+        self.overlay_renderer.finished.connect(self.on_overlay_ready)
+        self.overlay_renderer.error.connect(self.on_overlay_error)
+        self.overlay_renderer.start()
+        
+    def is_overlay_rendering(self):
+        return self.overlay_renderer is not None and self.overlay_renderer.isRunning()
+        
+    def on_overlay_ready(self, source_path, image_path):
+        self.set_btn.setEnabled(bool(self.current_wallpaper))
+        self.apply_wallpaper(image_path)
+        
+    def on_overlay_error(self, source_path, error_msg):
+        """合成に失敗したら元の画像で設定する（合成中に選択が変わっていても合成対象の画像）"""
+        print(f"キャプション合成エラー: {error_msg}")
+        self.set_btn.setEnabled(bool(self.current_wallpaper))
+        self.apply_wallpaper(source_path)
+        
+    def toggle_overlay(self, checked):
+        self.settings.setValue("overlay/enabled", checked)
+        
+    def apply_wallpaper(self, image_path):
+        """指定した画像ファイルをデスクトップ壁紙に設定"""
         try:
             self.status_label.setText("壁紙を設定中...")
             
@@ -763,15 +3313,15 @@ class BingWallpaperApp(QMainWindow):
             
             if desktop_env == "gnome":
                 cmd = ["gsettings", "set", "org.gnome.desktop.background", 
-                      "picture-uri", f"file://{self.current_wallpaper}"]
+                      "picture-uri", f"file://{image_path}"]
             elif desktop_env == "kde":
                 # KDE Plasma用のコマンド（複数の方法を試す）
                 kde_commands = [
-                    ["plasma-apply-wallpaperimage", self.current_wallpaper],
+                    ["plasma-apply-wallpaperimage", image_path],
                     ["qdbus", "org.kde.plasmashell", "/PlasmaShell", 
-                     "setWallpaper", self.current_wallpaper],
+                     "setWallpaper", image_path],
                     ["qdbus-qt5", "org.kde.plasmashell", "/PlasmaShell", 
-                     "setWallpaper", self.current_wallpaper]
+                     "setWallpaper", image_path]
                 ]
                 
                 cmd = None
@@ -792,14 +3342,14 @@ class BingWallpaperApp(QMainWindow):
             elif desktop_env == "xfce":
                 cmd = ["xfconf-query", "-c", "xfce4-desktop", 
                       "-p", "/backdrop/screen0/monitor0/workspace0/last-image", 
-                      "-s", self.current_wallpaper]
+                      "-s", image_path]
             else:
                 # フォールバック：複数の選択肢を試す
                 fallback_commands = [
-                    ["feh", "--bg-scale", self.current_wallpaper],
-                    ["nitrogen", "--set-scaled", self.current_wallpaper],
+                    ["feh", "--bg-scale", image_path],
+                    ["nitrogen", "--set-scaled", image_path],
                     ["gsettings", "set", "org.gnome.desktop.background", 
-                     "picture-uri", f"file://{self.current_wallpaper}"]
+                     "picture-uri", f"file://{image_path}"]
                 ]
                 
                 cmd = None
@@ -816,7 +3366,8 @@ class BingWallpaperApp(QMainWindow):
                     raise Exception("壁紙設定用のコマンドが見つかりません。\n"
                                   "feh、nitrogen、またはgsettingsをインストールしてください。")
                 
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+            with tracer.span("wallpaper.set", desktop=desktop_env, command=cmd[0]):
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
             
             if result.returncode == 0:
                 self.status_label.setText("✅ 壁紙を設定しました")
@@ -894,19 +3445,104 @@ class BingWallpaperApp(QMainWindow):
             event.accept()
 
 
+def parse_args(argv):
+    """コマンドライン引数を解析（Qt用の引数はそのまま QApplication に渡す）"""
+    parser = argparse.ArgumentParser(description="Linux Bing Wallpaper")
+    parser.add_argument("--fetch", action="store_true",
+                        help="起動直後に壁紙を取得（起動中のインスタンスがあればそちらで取得）")
+    parser.add_argument("--headless", action="store_true",
+                        help="ウィンドウを出さずに壁紙を取得して終了（cron向け）")
+    parser.add_argument("--backfill", action="store_true",
+                        help="過去の壁紙を遡って取得（中断しても続きから再開）")
+    parser.add_argument("--mirror", action="store_true",
+                        help="ダウンロード済みの壁紙をBing互換のHTTPミラーとして配信")
+    return parser.parse_known_args(argv)
+
+
+def run_headless_fetch(backfill=False):
+    """GUIなしで1回だけ取得する。他プロセスの取得中はロックで待ち、結果を再利用する"""
+    app = QCoreApplication(sys.argv[:1])
+    wallpaper_dir = get_wallpaper_dir()
+    wallpaper_dir.mkdir(parents=True, exist_ok=True)
+    settings = QSettings("BingWallpaper", "Settings")
+    
+    result = {}
+    if backfill:
+        fetcher = create_backfill_crawler(wallpaper_dir, settings)
+    else:
+        fetcher = create_fetcher(wallpaper_dir, settings)
+    fetcher.finished.connect(result.update)
+    fetcher.error.connect(lambda message: result.setdefault('error', message))
+    fetcher.progress.connect(lambda message, estimated, transferred: print(message))
+    fetcher.run()
+    
+    if 'error' in result:
+        print(f"壁紙の取得に失敗しました: {result['error']}")
+        return 1
+    if result['failed']:
+        print(f"{len(result['failed'])}枚の壁紙を取得できませんでした")
+        return 1
+    return 0
+
+
+def run_headless_mirror():
+    """GUIなしでミラーを配信し続ける"""
+    app = QCoreApplication(sys.argv[:1])
+    wallpaper_dir = get_wallpaper_dir()
+    wallpaper_dir.mkdir(parents=True, exist_ok=True)
+    server = create_mirror_server(wallpaper_dir, QSettings("BingWallpaper", "Settings"))
+    print(f"ミラーを公開中: {server.base_url}/HPImageArchive.aspx")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
 def main():
     """メイン関数"""
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv[1:])
+    if args.headless and args.mirror:
+        sys.exit(run_headless_mirror())
+    if args.headless:
+        sys.exit(run_headless_fetch(backfill=args.backfill))
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setApplicationName("Bing Wallpaper")
     app.setApplicationVersion("2.0")
     app.setOrganizationName("LinuxWallpaper")
     
+    # 既に起動中ならコマンドを渡して終了
+    instance = SingleInstance()
+    if args.backfill:
+        command = "backfill"
+    elif args.fetch:
+        command = "fetch"
+    else:
+        command = "show"
+    if not instance.start(command):
+        print("起動中のインスタンスにコマンドを送信しました")
+        sys.exit(0)
+    
+    # トレース出力先が指定されていれば計測を有効化し、終了時に書き出す
+    trace_path = os.environ.get(TRACE_ENV_VAR)
+    if trace_path:
+        tracer.enabled = True
+        app.aboutToQuit.connect(lambda: tracer.export(trace_path))
+    
     # アプリケーションアイコン設定
     app_icon = get_app_icon(64)
     app.setWindowIcon(app_icon)
     
     # メインウィンドウ作成
     window = BingWallpaperApp()
+    instance.command_received.connect(window.handle_command)
+    if args.backfill:
+        window.handle_command("backfill")
+    if args.mirror:
+        window.start_mirror()
     window.show()
     
     # システムトレイアイコン表示